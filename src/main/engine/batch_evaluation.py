@@ -0,0 +1,55 @@
+import numpy as np
+
+from src.main.gameplay.board_state import BoardState
+from src.main.utils.constants import *
+from src.main.utils.engine_constants import *
+
+
+# Vectorized evaluate_board for many stored positions at once (analysis and tuning, not the search).
+# Boards are an (N, BOARD_ROW, BOARD_COL) int8 array in white player perspective, pieces as in constants.
+
+# Signed tables indexed by [piece + 6] (and square), white pieces positive like BoardState's totals
+MATERIAL_TABLE = np.array(PIECE_MATERIAL, dtype=np.int64)
+PIECE_SQUARE_TABLE = np.array([[PIECE_SQUARE_VALUE[piece][index] for index in BOARD_SQUARES] for piece in range(13)],
+                              dtype=np.int64)
+SQUARE_RANGE = np.arange(BOARD_ROW * BOARD_COL)
+
+
+def board_states_to_arrays(board_states: list[BoardState]) -> tuple[np.ndarray, np.ndarray]:
+    """(N, BOARD_ROW, BOARD_COL) int8 boards and the N-vector of is_white_turn"""
+    boards = np.array([[board_state.squares[index] for index in BOARD_SQUARES] for board_state in board_states],
+                      dtype=np.int8).reshape(-1, BOARD_ROW, BOARD_COL)
+    is_white_turn = np.array([board_state.is_white_turn for board_state in board_states], dtype=bool)
+    return boards, is_white_turn
+
+
+def arrays_to_board_states(boards: np.ndarray, is_white_turn: np.ndarray) -> list[BoardState]:
+    board_states = []
+    for board, white_turn in zip(boards, is_white_turn):
+        board_state = BoardState(bool(white_turn))
+        board_state.board = board.tolist()
+        board_states.append(board_state)
+    return board_states
+
+
+def evaluate_boards(boards: np.ndarray, engine_white_turn: np.ndarray) -> np.ndarray:
+    """
+    Scores of N boards, identical to evaluate_board(board_state, engine_white_turn[i]) for every board.
+    engine_white_turn can be a bool N-vector or a single bool for all boards.
+    """
+    pieces = boards.reshape(len(boards), -1).astype(np.intp) + 6
+    material = MATERIAL_TABLE[pieces].sum(axis=1)
+    piece_square = PIECE_SQUARE_TABLE[pieces, SQUARE_RANGE].sum(axis=1)
+
+    # Flip to the engine's perspective
+    sign = np.where(engine_white_turn, 1, -1)
+    material_difference = sign * material
+    scores = sign * piece_square
+
+    current_piece_count = np.count_nonzero(boards.reshape(len(boards), -1), axis=1)
+    scores += np.where(material_difference >= 300, TRADE_BONUS * (TOTAL_PIECE_COUNT - current_piece_count), 0)
+
+    # King vs King, King vs Knight
+    knight_count = (pieces == WHITE_KNIGHT + 6).sum(axis=1) + (pieces == BLACK_KNIGHT + 6).sum(axis=1)
+    insufficient_material = (current_piece_count == 2) | ((current_piece_count == 3) & (knight_count == 1))
+    return np.where(insufficient_material, 0, scores)
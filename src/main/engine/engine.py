@@ -1,81 +1,470 @@
-from typing import Any
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
 
 from src.main.engine.stats import Stats
-from src.main.engine.transposition_table import TTEntry
+from src.main.engine.shared_transposition_table import SharedTranspositionTable
+from src.main.engine.transposition_table import TranspositionTable
 from src.main.gameplay.board_state import BoardState
 from src.main.gameplay.move_generator import MoveGenerator
-from src.main.gameplay.move_state import MoveState
-from src.main.engine.evaluation import evaluate_board
+from src.main.gameplay.move_state import *
+from src.main.engine.evaluation import EvalCache, evaluate_board
+from src.main.engine.see import StaticExchange, SEE_VALUES
 from src.main.utils.constants import *
 
 
+# Search window bound, larger than any score (mate scores included)
+INF = 10 ** 9
+# Ordering score of a killer move, above any history score (those are halved every move)
+KILLER_SCORE = 1 << 30
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time limit of play_move runs out"""
+
+
+# Root split worker processes: every process keeps one Engine (and its transposition table) for all its tasks,
+# and reads the best root score found so far from a shared value before every root move
+_root_worker_engine = None
+_root_worker_alpha = None
+_root_worker_search_id = None
+
+
+def _init_root_worker(engine_options: dict, shared_alpha):
+    global _root_worker_engine, _root_worker_alpha
+    _root_worker_engine = Engine(**engine_options)
+    _root_worker_alpha = shared_alpha
+
+
+def _search_root_move(board_state: BoardState, move: int, depth: int, beta: int, deadline: float | None,
+                      search_id: int):
+    """
+    Worker for Engine(workers > 1), searches one root move against the shared alpha and the root window's beta.
+    alpha is read once when the task starts, improvements found later by other workers don't reach it.
+    search_id numbers the play_move calls of the main engine, the first task of a new one ages the table
+    and the move ordering like play_move does.
+    Returns (score, principal variation, nodes, q nodes), or None when the time ran out.
+    """
+    global _root_worker_search_id
+    engine = _root_worker_engine
+    if search_id != _root_worker_search_id:
+        _root_worker_search_id = search_id
+        engine.transposition_table.end_search()
+        engine.age_move_ordering(depth + 2)
+    engine.stats.reset()
+    engine.deadline = deadline
+    engine.pv_table = [[] for _ in range(depth + 2)]
+    engine.killer_moves += [[None, None] for _ in range(depth + 2 - len(engine.killer_moves))]
+
+    alpha = _root_worker_alpha.value
+    board_state.make_move(move)
+    try:
+        # Null window against alpha first, a full search only if the move is better
+        score = engine.pvs_child(board_state, depth - 1, alpha, beta, 1, first=alpha == -INF)
+    except SearchTimeout:
+        return None
+
+    stats = engine.stats
+    if score <= alpha:
+        # only an upper bound, the move is no better than one searched before
+        return -INF, [], stats.nodes_visited, stats.q_nodes_visited
+    with _root_worker_alpha.get_lock():
+        if score > _root_worker_alpha.value:
+            _root_worker_alpha.value = score
+    return score, [move] + engine.pv_table[1], stats.nodes_visited, stats.q_nodes_visited
+
+
+# Lazy SMP helper processes: every helper keeps one Engine on the shared transposition table
+# and searches the same root as the main process until the main search sets the stop event
+_smp_helper_engine = None
+
+
+def _init_smp_helper(engine_options: dict, table_name: str, stop_event):
+    global _smp_helper_engine
+    _smp_helper_engine = Engine(**engine_options, shared_table_name=table_name)
+    _smp_helper_engine.stop_event = stop_event
+
+
+def _lazy_smp_search(board_state: BoardState, max_depth: int, depth_offset: int) -> int:
+    """
+    Worker for Engine(helpers > 0), iterative deepening on the root until stopped, depth_offset plies deeper
+    than the main search. Its results only reach the main search through the table. Returns the nodes searched.
+    """
+    engine = _smp_helper_engine
+    engine.stats.reset()
+    engine.deadline = float('inf')  # only the stop event ends the search, checked with the clock
+    root_moves = engine.gen_and_order_move(board_state)
+    engine.pv_table = [[] for _ in range(max_depth + depth_offset + 2)]
+    engine.age_move_ordering(max_depth + depth_offset + 2)
+
+    try:
+        for depth in range(1 + depth_offset, max_depth + depth_offset + 1):
+            _, principal_variation = engine.search_root(board_state, root_moves, depth)
+            if principal_variation:
+                root_moves.remove(principal_variation[0])
+                root_moves.insert(0, principal_variation[0])
+    except SearchTimeout:
+        pass
+    return engine.stats.nodes_visited + engine.stats.q_nodes_visited
+
+
 class Engine:
-    def __init__(self, depth=5, engine_white_turn=False, use_quiescence=True):
+    def __init__(self, depth=5, engine_white_turn=False, use_quiescence=True, eval_cache_size=1 << 16,
+                 delta_margin=200, futility_margins=(200, 500), aspiration_window=50, use_null_move=False,
+                 late_move_reductions=((3, 1),), workers=1, helpers=0, tt_size_mb=16,
+                 shared_table_name=None, move_generator=None):
         self.depth = depth
+        self.tt_size_mb = tt_size_mb
         self.q_depth = 3
         self.use_quiescence = use_quiescence
         self.engine_white_turn = engine_white_turn
-        self.move_generator = MoveGenerator()
-        self.transposition_table = {}
-        self.tt_threshold = 200000
+        # MoveGenerator by default, BitboardMoveGenerator for BitboardState boards.
+        # The static exchange evaluation reads the mailbox tables either way
+        mailbox_generator = MoveGenerator()
+        self.move_generator = move_generator or mailbox_generator
+        self.static_exchange = StaticExchange(mailbox_generator)
+        # search results by Zobrist key, tt_size_mb of preallocated arrays kept across play_move calls.
+        # Lazy SMP (helpers, below) creates the table in shared memory, the helpers attach to it by shared_table_name
+        if shared_table_name is not None:
+            self.transposition_table = SharedTranspositionTable(name=shared_table_name)
+        elif helpers:
+            self.transposition_table = SharedTranspositionTable(tt_size_mb)
+        else:
+            self.transposition_table = TranspositionTable(tt_size_mb)
+        # static evaluations by Zobrist key, kept across play_move calls (0 disables it)
+        self.eval_cache = EvalCache(eval_cache_size) if eval_cache_size else None
+        # Pruning margins, None disables them:
+        # delta pruning in quiescence, and futility / reverse futility pruning at depth 1, 2, ... (one margin per depth)
+        self.delta_margin = delta_margin
+        self.futility_margins = futility_margins or ()
+        # Half width of the first root window around the previous iteration's score, doubled on every
+        # fail high / fail low (None searches every iteration with the full window)
+        self.aspiration_window = aspiration_window
+        # Null move pruning, the null move search is this much shallower than depth - 1.
+        # Off by default, it lost a time-limited match against the plain search (test/engine_match.py)
+        self.use_null_move = use_null_move
+        self.null_move_reduction = 2
+        # Late move reductions, (moves searched, reduction) pairs: a quiet move after that many moves is searched
+        # that much shallower with a null window, and again at full depth if it beats alpha. None disables them.
+        # A second step like (8, 2) showed no clear gain in a time-limited match (test/engine_match.py)
+        self.late_move_reductions = late_move_reductions or ()
+        self.lmr_min_depth = 3
         self.stats = Stats()
+        # time.time() at which the running search has to stop, None without a time limit
+        self.deadline = None
+        # pv_table[ply] is the principal variation found below the node at ply, filled by alpha_beta
+        self.pv_table = []
+        self.principal_variation = []
+        # Quiet move ordering: two killer moves per ply (quiet moves that caused a beta cutoff at that ply)
+        # and history[from][to], the depth squared summed over the quiet moves' cutoffs
+        self.killer_moves = []
+        self.history = [[0] * MAILBOX_SIZE for _ in range(MAILBOX_SIZE)]
         self.CHECK_MATE_SCORE = 1000000
 
+        # Root split: with workers > 1 the root moves of every iteration from depth 3 are spread over a process pool
+        # (started on the first play_move), the workers search with the same settings
+        self.workers = workers
+        self.worker_options = dict(depth=depth, engine_white_turn=engine_white_turn, use_quiescence=use_quiescence,
+                                   eval_cache_size=eval_cache_size, delta_margin=delta_margin,
+                                   futility_margins=futility_margins, use_null_move=use_null_move,
+                                   late_move_reductions=late_move_reductions, tt_size_mb=tt_size_mb,
+                                   move_generator=move_generator)
+        self.pool = None
+        self.shared_alpha = None
+        self.search_id = 0  # play_move calls so far, for the workers to age their tables once per search
+
+        # Lazy SMP: with helpers > 0 that many helper processes search every position next to the main search,
+        # everything through one transposition table of tt_size_mb in shared memory (created above).
+        # Set in the helpers, the main search stops them through it
+        self.helpers = helpers
+        self.stop_event = None
+        self.helper_pool = None
+
 
     def engines_turn(self, board_state: BoardState) -> bool:
         return board_state.is_white_turn == self.engine_white_turn
 
-    def trim_transposition_table(self, threshold):
-
-        if len(self.transposition_table) >= threshold:
-            # Sort items by depth (higher depth entries are more valuable)
-            sorted_items = sorted(
-                self.transposition_table.items(), 
-                key=lambda x: x[1].depth,
-                reverse=True
-            )
-            # Keep only the top half
-            half_size = len(sorted_items) // 2
-            self.transposition_table = dict(sorted_items[:half_size])
-            # print(f"Trimmed transposition table from {len(sorted_items)} to {len(self.transposition_table)} entries")
-
+    def evaluate(self, board_state: BoardState, key: int) -> int:
+        """Static evaluation from the engine's perspective, through the evaluation cache"""
+        if self.eval_cache is None:
+            return evaluate_board(board_state, self.engine_white_turn)
 
-    def play_move(self, board_state: BoardState) -> MoveState:
+        self.stats.eval_cache_probes += 1
+        score = self.eval_cache.probe(key, self.engine_white_turn)
+        if score is None:
+            score = evaluate_board(board_state, self.engine_white_turn)
+            self.eval_cache.store(key, self.engine_white_turn, score)
+        else:
+            self.stats.eval_cache_hits += 1
+        return score
+
+    def evaluate_side_to_move(self, board_state: BoardState, key: int) -> int:
+        """evaluate() turned to the side to move, for the negamax search"""
+        score = self.evaluate(board_state, key)
+        return score if self.engines_turn(board_state) else -score
+
+    def is_in_check(self, board_state: BoardState) -> bool:
+        """Whether the king of the side to move can be captured right now"""
+        king = WHITE_KING if board_state.is_white_turn else BLACK_KING
+        squares = board_state.squares
+        for index in board_state.own_pieces():
+            if squares[index] == king:
+                return self.static_exchange.least_valuable_attacker(squares, index, not board_state.is_white_turn, ()) is not None
+        return False
+
+    def has_piece_material(self, board_state: BoardState) -> bool:
+        """Whether the side to move has a piece besides its pawns and king"""
+        sign = 1 if board_state.is_white_turn else -1
+        piece_counts = board_state.piece_counts
+        return any(piece_counts[piece * sign + 6] for piece in (WHITE_ROOK, WHITE_KNIGHT, WHITE_BISHOP, WHITE_QUEEN))
+
+    def age_move_ordering(self, plies: int):
+        """
+        Carry the quiet move ordering over to the next search: two plies were played since the last one,
+        so the killers move up two plies, and the history is halved so recent cutoffs weigh more.
+        """
+        self.killer_moves = (self.killer_moves[2:] + [[None, None] for _ in range(plies)])[:plies]
+        for row in self.history:
+            for to_index, value in enumerate(row):
+                if value:
+                    row[to_index] = value >> 1
+
+    def store_quiet_cutoff(self, move: int, depth: int, ply: int):
+        """Killer and history update for a quiet move that caused a beta cutoff"""
+        killers = self.killer_moves[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self.history[move_from_index(move)][move_to_index(move)] += depth * depth
+
+
+    def play_move(self, board_state: BoardState, time_limit: float = None, max_depth: int = None) -> int:
+        """
+        Search the position and return the best move, packed (see move_state).
+        Iterative deepening: searches depth 1, 2, ... up to max_depth (default self.depth), every iteration
+        starting with the best move of the previous one. With a time_limit (seconds) the search stops when
+        time is up and the best move of the last completed depth is returned (depth 1 always completes).
+        The principal variation of that depth is left in self.principal_variation.
+        """
         # print(f"Transposition table size: {len(self.transposition_table)}")
         self.stats.reset()
-        best_move = None
-        best_score = float('-inf')
+        self.search_id += 1
+        max_depth = max_depth or self.depth
+        deadline = time.time() + time_limit if time_limit is not None else None
+        # depth 1 is searched without the deadline, so there always is a searched move (and score) to return
+        self.deadline = None
+        history_length = len(board_state.move_history)
 
         # Generate all possible moves for the current player
-        possible_moves = self.gen_and_order_move(board_state)
-
-        for move in possible_moves:
-
-            board_state.make_move(move)
-            score = self.alpha_beta(board_state, self.depth - 1, float('-inf'), float('inf'), False)
-            board_state.undo_move()
-
-            # Update the best move based on score
-            if score > best_score:
-                best_score = score
-                best_move = move
-
-        # Trim the transposition table after completing the search
-        self.trim_transposition_table(self.tt_threshold)
+        root_moves = self.gen_and_order_move(board_state)
+        # the hash move of an earlier search of this position goes first
+        entry = self.transposition_table.probe(hash(board_state))
+        if entry and entry.best_move in root_moves:
+            root_moves.remove(entry.best_move)
+            root_moves.insert(0, entry.best_move)
+        best_move = root_moves[0] if root_moves else None
+        best_score = -INF
+        self.principal_variation = []
+        self.pv_table = [[] for _ in range(max_depth + 2)]
+        self.age_move_ordering(max_depth + 2)
+        helper_futures = self.start_helpers(board_state, max_depth) if self.helpers and root_moves else []
+
+        for depth in range(1, max_depth + 1):
+            # don't start another iteration without time left, from depth 2 the search stops at the deadline
+            if deadline is not None and depth > 1:
+                if time.time() >= deadline:
+                    break
+                self.deadline = deadline
+            try:
+                if self.workers > 1 and depth > 2 and len(root_moves) > 1:
+                    search = self.parallel_search_root
+                else:
+                    search = self.search_root
+                best_score, principal_variation = self.aspiration_search(board_state, root_moves, depth, best_score,
+                                                                         search)
+            except SearchTimeout:
+                # Take back the moves of the interrupted iteration, its results are thrown away
+                while len(board_state.move_history) > history_length:
+                    if board_state.move_history[-1] == NULL_MOVE:
+                        board_state.undo_null_move()
+                    else:
+                        board_state.undo_move()
+                break
+
+            if principal_variation:
+                best_move = principal_variation[0]
+                # Best move first for the next iteration, the rest keep their order
+                root_moves.remove(best_move)
+                root_moves.insert(0, best_move)
+            self.principal_variation = principal_variation
+            self.stats.depth_reached = depth
+
+        self.deadline = None
+        self.stop_helpers(helper_futures)
+        # Age the entries of this search in the transposition table
+        self.transposition_table.end_search()
         
         self.stats.evaluation = best_score
         print(f"Evaluation: {best_score}")
         return best_move
 
 
+    def aspiration_search(self, board_state: BoardState, root_moves: list[int], depth: int,
+                          previous_score: int, search=None) -> tuple[int, list[int]]:
+        """
+        search (search_root or parallel_search_root) in a narrow window around previous_score
+        (the last iteration's result).
+        A score outside the window is only a bound, so the failing side of the window is widened
+        (doubling every time) and the depth searched again until the score lands inside it.
+        """
+        search = search or self.search_root
+        window = self.aspiration_window
+        # first iteration, or a mate score that moves by more than any window between iterations
+        if window is None or depth == 1 or abs(previous_score) >= self.CHECK_MATE_SCORE:
+            return search(board_state, root_moves, depth, -INF, INF)
+
+        alpha, beta = previous_score - window, previous_score + window
+        while True:
+            score, principal_variation = search(board_state, root_moves, depth, alpha, beta)
+            if score <= alpha:
+                self.stats.aspiration_researches['FAIL_LOW'] += 1
+                window *= 2
+                alpha = max(score - window, -INF)
+            elif score >= beta:
+                self.stats.aspiration_researches['FAIL_HIGH'] += 1
+                window *= 2
+                beta = min(score + window, INF)
+            else:
+                return score, principal_variation
+
+    def search_root(self, board_state: BoardState, root_moves: list[int], depth: int,
+                    alpha: int = -INF, beta: int = INF) -> tuple[int, list[int]]:
+        """Principal variation search over the root moves, returns (score, principal variation)"""
+        best_score = -INF
+        principal_variation = []
 
-    def alpha_beta(self, board_state: BoardState, depth: int, alpha: float, beta: float, is_maximizing_player: bool) -> float | int | Any:
+        for move in root_moves:
+            board_state.make_move(move)
+            score = self.pvs_child(board_state, depth - 1, alpha, beta, 1, first=not principal_variation)
+            board_state.undo_move()
+
+            if score > best_score:
+                best_score = score
+                principal_variation = [move] + self.pv_table[1]
+                alpha = max(alpha, score)
+                if alpha >= beta:
+                    break  # fail high, the window gets widened and the depth searched again
+        return best_score, principal_variation
+
+
+    def parallel_search_root(self, board_state: BoardState, root_moves: list[int], depth: int,
+                             alpha: int = -INF, beta: int = INF) -> tuple[int, list[int]]:
+        """
+        search_root with the root moves split over the worker processes. The first move is searched here,
+        so the workers start with its score as alpha, and every improvement is shared for the moves after it.
+        """
+        if self.pool is None:
+            self.shared_alpha = multiprocessing.Value('q', -INF)
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_init_root_worker,
+                                            initargs=(self.worker_options, self.shared_alpha))
+
+        board_state.make_move(root_moves[0])
+        best_score = self.pvs_child(board_state, depth - 1, alpha, beta, 1, first=True)
+        board_state.undo_move()
+        principal_variation = [root_moves[0]] + self.pv_table[1]
+        if best_score >= beta:
+            return best_score, principal_variation  # fail high, the window gets widened and the depth searched again
+        self.shared_alpha.value = max(alpha, best_score)
+
+        # The workers get their own copy, board_state itself changes again before all of them are sent
+        root = board_state.copy()
+        futures = [self.pool.submit(_search_root_move, root, move, depth, beta, self.deadline, self.search_id)
+                   for move in root_moves[1:]]
+        # collected in root move order, so ties go to the earlier move like in search_root
+        for future in futures:
+            result = future.result()
+            if result is None:
+                for pending in futures:
+                    pending.cancel()
+                raise SearchTimeout
+            score, move_variation, nodes, q_nodes = result
+            self.stats.nodes_visited += nodes
+            self.stats.q_nodes_visited += q_nodes
+            if score > best_score:
+                best_score = score
+                principal_variation = move_variation
+                if best_score >= beta:
+                    # fail high, the moves still running are waited for so they can't raise the next search's alpha
+                    for pending in futures:
+                        pending.cancel()
+                    wait(futures)
+                    break
+        return best_score, principal_variation
+
+    def start_helpers(self, board_state: BoardState, max_depth: int) -> list:
+        """Start the lazy SMP helpers on the root, every second one a ply deeper than the main search"""
+        if self.helper_pool is None:
+            self.stop_event = multiprocessing.Event()
+            helper_options = dict(self.worker_options, engine_white_turn=self.engine_white_turn)
+            self.helper_pool = ProcessPoolExecutor(self.helpers, initializer=_init_smp_helper,
+                                                   initargs=(helper_options, self.transposition_table.name,
+                                                             self.stop_event))
+        root = board_state.copy()
+        return [self.helper_pool.submit(_lazy_smp_search, root, max_depth, helper % 2 + 1)
+                for helper in range(self.helpers)]
+
+    def stop_helpers(self, helper_futures: list):
+        if not helper_futures:
+            return
+        self.stop_event.set()
+        self.stats.helper_nodes_visited = sum(future.result() for future in helper_futures)
+        self.stop_event.clear()
+
+    def close(self):
+        """Shut down the worker and helper processes and free the shared table (no-op without them)"""
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+        if self.helper_pool is not None:
+            self.helper_pool.shutdown(cancel_futures=True)
+            self.helper_pool = None
+        if isinstance(self.transposition_table, SharedTranspositionTable):
+            self.transposition_table.close()
+            self.transposition_table = TranspositionTable(self.tt_size_mb)
+
+
+    def check_time(self):
+        if time.time() >= self.deadline or (self.stop_event is not None and self.stop_event.is_set()):
+            raise SearchTimeout
+
+
+    def pvs_child(self, board_state: BoardState, depth: int, alpha: int, beta: int, ply: int, first: bool) -> int:
+        """
+        Score of the move just made, from the mover's side. The first move gets the full window, later ones
+        a null window around alpha and a full window re-search only if they turn out better (fail high).
+        """
+        if first:
+            return -self.alpha_beta(board_state, depth, -beta, -alpha, ply)
+        score = -self.alpha_beta(board_state, depth, -alpha - 1, -alpha, ply)
+        if alpha < score < beta:
+            score = -self.alpha_beta(board_state, depth, -beta, -alpha, ply)
+        return score
+
+
+
+    def alpha_beta(self, board_state: BoardState, depth: int, alpha: int, beta: int, ply: int) -> int:
+        """Negamax alpha-beta, the score is from the side to move's perspective"""
         original_alpha = alpha
         original_beta = beta
         key = hash(board_state)
+        self.pv_table[ply] = []
+
+        # A position repeated on the current path or from the game history is a draw, whatever the table says
+        if board_state.is_repetition():
+            return 0
 
         # Transposition table lookup
-        entry = self.transposition_table.get(key)
+        entry = self.transposition_table.probe(key)
         if entry and entry.depth >= depth:
             if entry.flag == 'EXACT':
                 return entry.value
@@ -85,87 +474,122 @@ class Engine:
                 beta = min(beta, entry.value)
             if alpha >= beta:
                 return entry.value
+        tt_move = entry.best_move if entry else None
 
         self.stats.nodes_visited += 1
+        # Look at the clock every 256 nodes
+        if self.deadline is not None and self.stats.nodes_visited & 255 == 0:
+            self.check_time()
         # main alpha-beta search
         if board_state.is_check_mate():
-            score = self.CHECK_MATE_SCORE + depth
-            return -score if is_maximizing_player else score
+            # the side to move has lost its king, sooner is worse
+            return -(self.CHECK_MATE_SCORE + depth)
 
         if depth == 0:
             if self.use_quiescence:
-                return self.quiescence_search(board_state, self.q_depth, alpha, beta, is_maximizing_player)
+                return self.quiescence_search(board_state, self.q_depth, alpha, beta)
             else:
-                return evaluate_board(board_state, self.engine_white_turn)
-
-
-
-        possible_moves = self.gen_and_order_move(board_state)
-        if not possible_moves:
-            return 0  # Stale-mate
-
-
-        if is_maximizing_player:
-            max_eval = float('-inf')
-            best_move = None
-
-            for move in possible_moves:
-                board_state.make_move(move)
-                eval = self.alpha_beta(board_state, depth - 1, alpha, beta, False)  # Minimize for the opponent
-                board_state.undo_move()
-
-                if eval > max_eval:
-                    max_eval = eval
-                    best_move = move
-                alpha = max(alpha, eval)
-
-                if beta <= alpha:
-                    break  # Prune the search
-
-            # Store in TT
-            flag = (
-                'EXACT' if original_alpha < max_eval < original_beta else
-                'LOWERBOUND' if max_eval >= original_beta else
-                'UPPERBOUND'
-            )
-            self.transposition_table[key] = TTEntry(max_eval, depth, flag, best_move)
-
-            return max_eval
-        else:
-            min_eval = float('inf')
-            best_move = None
-
-            for move in possible_moves:
-                board_state.make_move(move)
-                eval = self.alpha_beta(board_state, depth - 1, alpha, beta, True)  # Maximize for the player
-                board_state.undo_move()
-
-                if eval < min_eval:
-                    min_eval = eval
-                    best_move = move
-                beta = min(beta, eval)
-
-                if beta <= alpha:
-                    break  # Prune the search
-
-
-            # Store in TT
-            flag = (
-                'EXACT' if original_alpha < min_eval < original_beta else
-                'UPPERBOUND' if min_eval <= original_alpha else
-                'LOWERBOUND'
-            )
-            self.transposition_table[key] = TTEntry(min_eval, depth, flag, best_move)
-            return min_eval
-
+                return self.evaluate_side_to_move(board_state, key)
+
+        # Futility pruning near the leaves: if the static score is a margin past beta the node fails high
+        # (reverse futility), if it can't reach alpha even with the margin only captures and promotions are searched
+        prune_quiet = False
+        if depth <= len(self.futility_margins) and not self.is_in_check(board_state):
+            margin = self.futility_margins[depth - 1]
+            static_eval = self.evaluate_side_to_move(board_state, key)
+            if static_eval - margin >= beta:
+                self.stats.pruned['REVERSE_FUTILITY'] += 1
+                return static_eval - margin
+            prune_quiet = static_eval + margin <= alpha
+
+        # Null move pruning: if passing the turn still fails high at reduced depth, a real move will too.
+        # Not twice in a row, not in check and not for a side with only pawns and king left, zugzwang
+        # (every move makes it worse) is common in those endings on this board and passing would be wrong
+        if (self.use_null_move and depth > self.null_move_reduction and beta < self.CHECK_MATE_SCORE
+                and (not board_state.move_history or board_state.move_history[-1] != NULL_MOVE)
+                and self.has_piece_material(board_state)
+                and self.evaluate_side_to_move(board_state, key) >= beta
+                and not self.is_in_check(board_state)):
+            board_state.make_null_move()
+            score = -self.alpha_beta(board_state, depth - 1 - self.null_move_reduction, -beta, -beta + 1, ply + 1)
+            board_state.undo_null_move()
+            if score >= beta:
+                self.stats.pruned['NULL_MOVE'] += 1
+                # a mate found after passing isn't proven
+                return score if score < self.CHECK_MATE_SCORE else beta
+
+        best_score = -INF
+        best_move = None
+        moves_searched = 0
+        in_check = None  # only looked up once a move could be reduced
+
+        # Moves are generated stage by stage as the search asks for them
+        for move, stage in self.pick_moves(board_state, tt_move, ply=ply):
+            if prune_quiet and stage == 'QUIET':
+                self.stats.pruned['FUTILITY'] += 1
+                continue
+
+            reduction = 0
+            if stage == 'QUIET' and depth >= self.lmr_min_depth and move not in self.killer_moves[ply]:
+                for late_moves, late_reduction in self.late_move_reductions:
+                    if moves_searched >= late_moves:
+                        reduction = late_reduction
+                if reduction:
+                    if in_check is None:
+                        in_check = self.is_in_check(board_state)
+                    if in_check:
+                        reduction = 0
 
+            board_state.make_move(move)
+            if reduction:
+                self.stats.late_move_reductions += 1
+                score = -self.alpha_beta(board_state, max(depth - 1 - reduction, 0), -alpha - 1, -alpha, ply + 1)
+                if score > alpha:
+                    self.stats.late_move_researches += 1
+                    score = self.pvs_child(board_state, depth - 1, alpha, beta, ply + 1, first=False)
+            else:
+                score = self.pvs_child(board_state, depth - 1, alpha, beta, ply + 1, first=best_move is None)
+            board_state.undo_move()
+            moves_searched += 1
 
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+                    if alpha >= beta:
+                        self.stats.cutoffs[stage] += 1
+                        if moves_searched == 1:
+                            self.stats.first_move_cutoffs += 1
+                        if not move & (MOVE_CAPTURED_MASK | MOVE_PROMOTION_FLAG):
+                            self.store_quiet_cutoff(move, depth, ply)
+                        break  # Prune the search
+
+        if best_move is None:
+            # every move was futility pruned, otherwise stale-mate
+            return static_eval if prune_quiet else 0
+
+        # Store in TT
+        flag = (
+            'UPPERBOUND' if best_score <= original_alpha else
+            'LOWERBOUND' if best_score >= original_beta else
+            'EXACT'
+        )
+        self.transposition_table.store(key, best_score, depth, flag, best_move)
+        return best_score
+
+
+
+    def quiescence_search(self, board_state: BoardState, depth: int, alpha: int, beta: int) -> int:
+        """Negamax search of captures and promotions only, the score is from the side to move's perspective"""
+        # Quiescence entries are stored below depth 0, so a main search probe never takes them for a full-width result
+        tt_depth = depth - self.q_depth - 1
 
-    def quiescence_search(self, board_state: BoardState, depth: int, alpha: float, beta: float, is_maximizing_player: bool) -> float:
         # Lookup position in transposition table
         key = hash(board_state)
-        entry = self.transposition_table.get(key)
-        if entry and entry.depth >= depth:
+        entry = self.transposition_table.probe(key)
+        if entry and entry.depth >= tt_depth:
             if entry.flag == 'EXACT':
                 return entry.value
             elif entry.flag == 'LOWERBOUND':
@@ -174,22 +598,24 @@ class Engine:
                 beta = min(beta, entry.value)
             if alpha >= beta:
                 return entry.value
+        tt_move = entry.best_move if entry else None
 
         original_alpha = alpha
         original_beta = beta
         self.stats.q_nodes_visited += 1
+        if self.deadline is not None and self.stats.q_nodes_visited & 255 == 0:
+            self.check_time()
 
         # Check terminal conditions
         if board_state.is_check_mate():
-            score = self.CHECK_MATE_SCORE + depth
-            return -score if is_maximizing_player else score
+            return -(self.CHECK_MATE_SCORE + depth)
 
         # Stand-pat: Evaluate the current position
-        stand_pat = evaluate_board(board_state, self.engine_white_turn)
+        stand_pat = self.evaluate_side_to_move(board_state, key)
 
-        # Early cutoffs
+        # Early cutoffs (fail soft, the stand pat score is a better bound than beta for the re-searches)
         if stand_pat >= beta:
-            return beta
+            return stand_pat
         if alpha < stand_pat:
             alpha = stand_pat
 
@@ -198,92 +624,116 @@ class Engine:
         if depth <= 0:
             return stand_pat
 
-        # Generate only capture moves for quiescence search
-        possible_moves = self.move_generator.generate_capture_moves(board_state)
-        possible_moves = self.move_ordering(possible_moves)
-
-        if not possible_moves:
-            return stand_pat  # No captures available
-
-
+        # Only capture moves (and queen promotions) for quiescence search, no captures available leaves stand_pat
+        best_score = stand_pat
         best_move = None
+        moves_searched = 0
+
+        for move, stage in self.pick_moves(board_state, tt_move, captures_only=True):
+            # Delta pruning: even winning the captured piece for free doesn't reach alpha
+            if (self.delta_margin is not None and not move & MOVE_PROMOTION_FLAG
+                    and stand_pat + SEE_VALUES[move_captured_piece(move) + 6] + self.delta_margin <= alpha):
+                self.stats.pruned['DELTA'] += 1
+                continue
+            board_state.make_move(move)
+            score = -self.quiescence_search(board_state, depth - 1, -beta, -alpha)
+            board_state.undo_move()
+            moves_searched += 1
 
-        if is_maximizing_player:
-            max_eval = stand_pat
-
-            for move in possible_moves:
-                board_state.make_move(move)
-                eval = self.quiescence_search(board_state, depth - 1, alpha, beta, False)
-                board_state.undo_move()
-
-                if eval > max_eval:
-                    max_eval = eval
-                    best_move = move
-                alpha = max(alpha, max_eval)
-
-                if beta <= alpha:
-                    break  # Prune the search
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self.stats.cutoffs[stage] += 1
+                        if moves_searched == 1:
+                            self.stats.first_move_cutoffs += 1
+                        break  # Prune the search
 
-            # Store in TT
-            flag = (
-                'EXACT' if original_alpha < max_eval < original_beta else
-                'LOWERBOUND' if max_eval >= original_beta else
-                'UPPERBOUND'
-            )
-            self.transposition_table[key] = TTEntry(max_eval, depth, flag, best_move)
+        # Store in TT
+        flag = (
+            'UPPERBOUND' if best_score <= original_alpha else
+            'LOWERBOUND' if best_score >= original_beta else
+            'EXACT'
+        )
+        self.transposition_table.store(key, best_score, tt_depth, flag, best_move)
 
-            return max_eval
-        else:
-            min_eval = stand_pat
+        return best_score
 
-            for move in possible_moves:
-                board_state.make_move(move)
-                eval = self.quiescence_search(board_state, depth - 1, alpha, beta, True)
-                board_state.undo_move()
 
-                if eval < min_eval:
-                    min_eval = eval
-                    best_move = move
-                beta = min(beta, min_eval)
 
-                if beta <= alpha:
-                    break  # Prune the search
 
-            # Store in TT
-            flag = (
-                'EXACT' if original_alpha < min_eval < original_beta else
-                'UPPERBOUND' if min_eval <= original_alpha else
-                'LOWERBOUND'
-            )
-            self.transposition_table[key] = TTEntry(min_eval, depth, flag, best_move)
+    def move_ordering(self, moves: list[int], ply: int | None = None) -> list[int]:
+        """
+        Captures by MVV-LVA, quiet moves by the history table, and with a ply the killer moves
+        of that ply ahead of the other quiet moves.
+        """
+        if not moves:
+            return moves
 
-            return min_eval
+        killers = self.killer_moves[ply] if ply is not None and ply < len(self.killer_moves) else ()
+        history = self.history
 
+        def move_score(move: int) -> int:
+            score = 0
+            if move & MOVE_CAPTURED_MASK:
+                # MVV-LVA (Most Valuable Victim - Least Valuable Attacker)
+                captured_value = PIECE_VALUES.get(abs(move_captured_piece(move)), 0)
+                attacker_value = PIECE_VALUES.get(abs(move_moved_piece(move)), 0)
+                score += captured_value * 10 - attacker_value
+            elif move in killers:
+                # first killer before the second, both before any history score
+                score += KILLER_SCORE - killers.index(move)
+            elif not move & MOVE_PROMOTION_FLAG:
+                score += history[move_from_index(move)][move_to_index(move)]
 
+            return score
 
+        return sorted(moves, key=move_score, reverse=True)
 
 
 
-    def move_ordering(self, moves: list[MoveState]) -> list[MoveState]:
+    def pick_moves(self, board_state: BoardState, tt_move: int | None = None, captures_only=False, ply: int | None = None):
+        """
+        Staged move picker, yields (move, stage) and only generates a stage once the previous one is used up:
+        the transposition table move, then captures and promotions in MVV-LVA order, then quiet moves
+        (killers of ply first, then by history), then the captures that lose material by SEE.
+        In captures_only mode (quiescence) losing captures are skipped.
+        """
+        if tt_move is not None and (not captures_only or tt_move & (MOVE_CAPTURED_MASK | MOVE_PROMOTION_FLAG)):
+            if self.move_generator.is_pseudo_legal(board_state, tt_move):
+                # nothing is generated yet, a cutoff here skips the move generation of the node
+                self.stats.hash_moves += 1
+                yield tt_move, 'TT'
+            else:
+                tt_move = None
 
-        if not moves:
-            return moves
+        bad_captures = []
+        for move in self.move_ordering(self.move_generator.generate_capture_moves(board_state, include_promotions=True)):
+            if move == tt_move:
+                continue
+            # Taking a piece worth at least the attacker can't lose material, only the rest needs SEE
+            if (move & MOVE_CAPTURED_MASK
+                    and SEE_VALUES[move_moved_piece(move) + 6] > SEE_VALUES[move_captured_piece(move) + 6]
+                    and self.static_exchange.see(board_state, move) < 0):
+                bad_captures.append(move)
+                continue
+            yield move, 'CAPTURE'
 
-        def move_score(move: MoveState) -> int:
-            score = 0
-            if move.captured_piece:
-                # MVV-LVA (Most Valuable Victim - Least Valuable Attacker)
-                captured_value = PIECE_VALUES.get(abs(move.captured_piece), 0)
-                attacker_value = PIECE_VALUES.get(abs(move.moved_piece), 0)
-                score += captured_value * 10 - attacker_value
+        if captures_only:
+            return
 
-            return score
+        for move in self.move_ordering(self.move_generator.generate_quiet_moves(board_state), ply):
+            if move != tt_move:
+                yield move, 'QUIET'
 
-        return sorted(moves, key=move_score, reverse=True)
+        for move in bad_captures:
+            yield move, 'BAD_CAPTURE'
 
 
 
-    def gen_and_order_move(self, board_state: BoardState) -> list[MoveState]:
+    def gen_and_order_move(self, board_state: BoardState) -> list[int]:
         possible_moves = self.move_generator.generate_all_moves(board_state)
         possible_moves = self.move_ordering(possible_moves)
         return possible_moves
\ No newline at end of file
@@ -1,3 +1,5 @@
+from array import array
+
 from src.main.gameplay.board_state import BoardState
 from src.main.utils.utils import *
 from src.main.utils.constants import *
@@ -14,33 +16,24 @@ class BoardFeatures(NamedTuple):
 
 
 def extract_board_features(board_state: BoardState, engine_white_turn: bool) -> BoardFeatures:
-    board_row = len(board_state.board)
-    board_col = len(board_state.board[0])
-    material_difference = 0
-    positional_score = 0
-    current_piece_count = 0
+    squares = board_state.squares
+    material = 0
+    piece_square = 0
     piece_counts = {pt: 0 for pt in PIECE_VALUES.keys()}
 
-    for row in range(board_row):
-        for col in range(board_col):
-            piece = board_state.board[row][col]
-            if piece == EMPTY:
-                continue
-            current_piece_count += 1
-
-            abs_piece = abs(piece)
-            piece_counts[abs_piece] += 1
+    # Only the occupied squares are visited, the signed tables give white minus black
+    for pieces in (board_state.white_pieces, board_state.black_pieces):
+        for index in pieces:
+            piece = squares[index]
+            piece_counts[abs(piece)] += 1
+            material += PIECE_MATERIAL[piece + 6]
+            piece_square += PIECE_SQUARE_VALUE[piece + 6][index]
 
-            value = PIECE_VALUES.get(abs_piece, 0)
-            pos_row = row if is_white(piece) else board_row - 1 - row
-            bonus = POSITION_BONUS.get(abs_piece, [[0]*board_col]*board_row)[pos_row][col]
-
-            if is_white(piece) == engine_white_turn:
-                material_difference += value
-                positional_score += bonus
-            else:
-                material_difference -= value
-                positional_score -= bonus
+    if not engine_white_turn:
+        material, piece_square = -material, -piece_square
+    material_difference = material
+    positional_score = piece_square - material
+    current_piece_count = len(board_state.white_pieces) + len(board_state.black_pieces)
 
     return BoardFeatures(
         material_difference=material_difference,
@@ -50,15 +43,45 @@ def extract_board_features(board_state: BoardState, engine_white_turn: bool) ->
     )
 
 
+# Check every incremental evaluation against a full recompute from extract_board_features
+DEBUG_EVALUATION = False
+
+
 def evaluate_board(board_state: BoardState, engine_white_turn: bool) -> int:
     """Evaluates the board from the ENGINE'S perspective.
+    Reads the running totals kept by BoardState, so no board scan is needed.
     Returns:
         Positive score if engine has advantage,
         Negative score if opponent has advantage,
         Zero if equal position
     """
+    piece_counts = board_state.piece_counts
+    current_piece_count = len(board_state.white_pieces) + len(board_state.black_pieces)
+    if is_insufficient_material(piece_counts, current_piece_count):
+        score = 0
+    else:
+        if engine_white_turn:
+            material_difference = board_state.material
+            score = board_state.piece_square
+        else:
+            material_difference = -board_state.material
+            score = -board_state.piece_square
+        if material_difference >= 300:
+            score += TRADE_BONUS * (TOTAL_PIECE_COUNT - current_piece_count)
+
+    if DEBUG_EVALUATION:
+        expected = evaluate_board_full(board_state, engine_white_turn)
+        assert score == expected, f"Incremental evaluation {score} != full evaluation {expected}"
+    return score
+
+
+def evaluate_board_full(board_state: BoardState, engine_white_turn: bool) -> int:
+    """Same as evaluate_board, but recomputed from the board (slow, for checking the incremental totals)"""
     features = extract_board_features(board_state, engine_white_turn)
-    if is_insufficient_material(features):
+    piece_counts = [0] * 13
+    for piece_type, count in features.piece_counts.items():
+        piece_counts[piece_type + 6] = count
+    if is_insufficient_material(piece_counts, features.current_piece_count):
         return 0
 
     score = features.material_difference + features.positional_score
@@ -70,11 +93,42 @@ def evaluate_board(board_state: BoardState, engine_white_turn: bool) -> int:
 
 
 
-def is_insufficient_material(feature: BoardFeatures) -> bool:
-
-    if feature.current_piece_count == 2:
+def is_insufficient_material(piece_counts: list[int], current_piece_count: int) -> bool:
+    """piece_counts is indexed by piece + 6 like BoardState.piece_counts"""
+    if current_piece_count == 2:
         return True  # King vs King
-    if feature.current_piece_count == 3 and feature.piece_counts.get(WHITE_KNIGHT, 0) == 1:
+    if current_piece_count == 3 and piece_counts[WHITE_KNIGHT + 6] + piece_counts[BLACK_KNIGHT + 6] == 1:
         return True  # King vs Knight
 
-    return False
\ No newline at end of file
+    return False
+
+
+
+class EvalCache:
+    """
+    Fixed-size evaluation cache keyed by the Zobrist hash, one table per engine perspective.
+    Direct-mapped with always-replace, so memory stays at size slots per perspective however long the session runs.
+    """
+    def __init__(self, size=1 << 16):
+        # round down to a power of two so the slot is a mask of the key
+        self.size = 1 << max(size.bit_length() - 1, 0)
+        self.mask = self.size - 1
+        # indexed by engine_white_turn, key 0 marks an empty slot
+        self.keys = [array('Q', bytes(8 * self.size)) for _ in range(2)]
+        self.scores = [array('q', bytes(8 * self.size)) for _ in range(2)]
+
+    def probe(self, key: int, engine_white_turn: bool) -> int | None:
+        slot = key & self.mask
+        if self.keys[engine_white_turn][slot] == key:
+            return self.scores[engine_white_turn][slot]
+        return None
+
+    def store(self, key: int, engine_white_turn: bool, score: int):
+        slot = key & self.mask
+        self.keys[engine_white_turn][slot] = key
+        self.scores[engine_white_turn][slot] = score
+
+    def clear(self):
+        for table in self.keys:
+            table[:] = array('Q', bytes(8 * self.size))
+
@@ -0,0 +1,90 @@
+from src.main.gameplay.board_state import BoardState
+from src.main.gameplay.move_generator import MoveGenerator, UP, DOWN, LEFT, RIGHT
+from src.main.gameplay.move_state import *
+from src.main.utils.constants import *
+
+
+# piece value by signed piece + 6
+SEE_VALUES = [PIECE_VALUES.get(abs(piece), 0) for piece in range(-6, 7)]
+
+
+# Static Exchange Evaluation: material result of the whole capture sequence on one square,
+# both sides always recapturing with their least valuable attacker and free to stop when it stops paying.
+class StaticExchange:
+    def __init__(self, move_generator: MoveGenerator):
+        # reuse the precomputed target tables of the move generator, attacks are symmetric for these pieces
+        self.KNIGHT_MOVES_FROM = move_generator.KNIGHT_MOVES_FROM
+        self.KING_MOVES_FROM = move_generator.KING_MOVES_FROM
+        self.BISHOP_RAYS_FROM = move_generator.BISHOP_RAYS_FROM
+        self.ROOK_RAYS_FROM = move_generator.ROOK_RAYS_FROM
+
+    def see(self, board_state: BoardState, move: int) -> int:
+        """Material gain of a capture for the side making it (promotions are not counted)"""
+        target_index = (move >> MOVE_TO_SHIFT) & MOVE_SQUARE_MASK
+        moved_piece = PACKED_PIECE[(move >> MOVE_PIECE_SHIFT) & MOVE_PIECE_MASK]
+        captured_piece = PACKED_PIECE[(move >> MOVE_CAPTURED_SHIFT) & MOVE_PIECE_MASK]
+
+        # Pieces that already took part are skipped, which also uncovers x-ray attackers behind them
+        used = {move & MOVE_SQUARE_MASK}
+        gain = [SEE_VALUES[captured_piece + 6]]
+        attacker_value = SEE_VALUES[moved_piece + 6]
+        white = moved_piece < 0  # side to recapture
+
+        while True:
+            # speculative score if the piece on the square gets captured back, only kept if there is an attacker
+            gain.append(attacker_value - gain[-1])
+            attacker_index = self.least_valuable_attacker(board_state.squares, target_index, white, used)
+            if attacker_index is None:
+                break
+            used.add(attacker_index)
+            attacker_value = SEE_VALUES[board_state.squares[attacker_index] + 6]
+            white = not white
+
+        # Negamax the gains back to the first capture, every side may decline to recapture
+        for depth in range(len(gain) - 2, 0, -1):
+            gain[depth - 1] = -max(-gain[depth - 1], gain[depth])
+        return gain[0]
+
+    def least_valuable_attacker(self, squares: list[int], index: int, white: bool, used: set[int]) -> int | None:
+        """Square of the cheapest piece of one side attacking index, ignoring the squares in used"""
+        sign = 1 if white else -1
+
+        # A white pawn attacks upwards, so it stands one row below the target
+        pawn = WHITE_PAWN * sign
+        behind = index + (DOWN if white else UP)
+        for attacker_index in (behind + LEFT, behind + RIGHT):
+            if squares[attacker_index] == pawn and attacker_index not in used:
+                return attacker_index
+
+        knight = WHITE_KNIGHT * sign
+        for attacker_index in self.KNIGHT_MOVES_FROM[index]:
+            if squares[attacker_index] == knight and attacker_index not in used:
+                return attacker_index
+
+        # First piece on every ray that is still in play
+        bishop_index = rook_index = queen_index = None
+        for rays, slider in ((self.BISHOP_RAYS_FROM[index], WHITE_BISHOP * sign), (self.ROOK_RAYS_FROM[index], WHITE_ROOK * sign)):
+            for ray in rays:
+                for attacker_index in ray:
+                    piece = squares[attacker_index]
+                    if piece == EMPTY or attacker_index in used:
+                        continue
+                    if piece == slider:
+                        if slider == WHITE_BISHOP * sign:
+                            bishop_index = attacker_index
+                        else:
+                            rook_index = attacker_index
+                    elif piece == WHITE_QUEEN * sign:
+                        queen_index = attacker_index
+                    break
+
+        # PIECE_VALUES order: bishop (330) before rook (500) before queen
+        for attacker_index in (bishop_index, rook_index, queen_index):
+            if attacker_index is not None:
+                return attacker_index
+
+        king = WHITE_KING * sign
+        for attacker_index in self.KING_MOVES_FROM[index]:
+            if squares[attacker_index] == king and attacker_index not in used:
+                return attacker_index
+        return None
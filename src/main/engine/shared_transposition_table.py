@@ -0,0 +1,94 @@
+import atexit
+from multiprocessing import shared_memory
+
+from src.main.engine.transposition_table import FLAGS, FLAG_INDEX, TTEntry
+
+
+# Slot layout, two 64 bit words: key ^ data, data
+# data bits  0-23  value + VALUE_OFFSET
+#           24-31  depth + DEPTH_OFFSET (quiescence entries have negative depths)
+#           32-33  flag, index into FLAGS
+#           34-56  best move (packed, 0 = None)
+#           57-63  generation (search the entry was written in, wraps at 128)
+# The first two words are a header instead of a slot, word 0 holds the current generation for every process
+VALUE_OFFSET = 1 << 23
+DEPTH_OFFSET = 128
+MOVE_BITS = (1 << 23) - 1
+GENERATION_SHIFT = 57
+GENERATION_MASK = 0x7F
+
+
+class SharedTranspositionTable:
+    """
+    Transposition table in multiprocessing.shared_memory, one table for the main process and the lazy SMP helpers.
+    Slots are written without locks: a slot only counts for a key if its two words xor back to the key,
+    so a slot torn by two processes writing at once reads as empty instead of as a wrong entry.
+    One entry per slot, aged like TranspositionTable: another position takes the slot unless the entry there
+    is deeper than its depth after AGE_WEIGHT plies are taken off for every search since it was written.
+    """
+    AGE_WEIGHT = 4
+
+    def __init__(self, size_mb=16, name=None):
+        # name attaches to the table of another process, without it a new table is created (and owned)
+        if name is None:
+            self.shared_memory = shared_memory.SharedMemory(create=True, size=size_mb << 20)
+            # the segment outlives the process in /dev/shm unless unlinked, also when the program ends without close()
+            atexit.register(self.close)
+        else:
+            self.shared_memory = shared_memory.SharedMemory(name=name)
+        self.owner = name is None
+        self.name = self.shared_memory.name
+        self.words = self.shared_memory.buf.cast('Q')
+        self.slots = len(self.words) // 2 - 1
+
+    def probe(self, key: int) -> TTEntry | None:
+        index = (key % self.slots + 1) << 1
+        data = self.words[index + 1]
+        if self.words[index] ^ data != key:
+            return None
+        return TTEntry((data & 0xFFFFFF) - VALUE_OFFSET,
+                       ((data >> 24) & 0xFF) - DEPTH_OFFSET,
+                       FLAGS[(data >> 32) & 0x3],
+                       ((data >> 34) & MOVE_BITS) or None)
+
+    def store(self, key: int, value: int, depth: int, flag: str, best_move: int | None = None):
+        index = (key % self.slots + 1) << 1
+        words = self.words
+        generation = words[0]
+        data = words[index + 1]
+        if data:
+            old_depth = ((data >> 24) & 0xFF) - DEPTH_OFFSET
+            age = (generation - (data >> GENERATION_SHIFT)) & GENERATION_MASK
+            if words[index] ^ data == key:
+                # Same rule as TranspositionTable: a shallower bound of this search only leaves its move
+                if depth < old_depth and not age and flag != 'EXACT':
+                    if best_move is not None:
+                        data = data & ~(MOVE_BITS << 34) | best_move << 34
+                        words[index] = key ^ data
+                        words[index + 1] = data
+                    return
+                if best_move is None:
+                    best_move = ((data >> 34) & MOVE_BITS) or None
+            elif old_depth - self.AGE_WEIGHT * age > depth:
+                return
+        data = (value + VALUE_OFFSET
+                | (depth + DEPTH_OFFSET) << 24
+                | FLAG_INDEX[flag] << 32
+                | (best_move or 0) << 34
+                | generation << GENERATION_SHIFT)
+        words[index] = key ^ data
+        words[index + 1] = data
+
+    def end_search(self):
+        """Entries of the searches before this one lose worth, for the helpers as well (the generation is shared)"""
+        self.words[0] = (self.words[0] + 1) & GENERATION_MASK
+
+    def close(self):
+        if self.words is None:
+            return
+        self.words.release()
+        self.words = None
+        self.shared_memory.close()
+        if self.owner:
+            self.shared_memory.unlink()
+            atexit.unregister(self.close)
@@ -6,13 +6,61 @@ class Stats:
         self.nodes_visited = 0
         self.q_nodes_visited = 0
         self.evaluation = 0.0
+        self.depth_reached = 0  # last completed iterative deepening depth
+        # beta cutoffs by the move picker stage of the cutoff move
+        self.cutoffs = {'TT': 0, 'CAPTURE': 0, 'QUIET': 0, 'BAD_CAPTURE': 0}
+        self.first_move_cutoffs = 0  # cutoffs by the first move searched at the node
+        self.hash_moves = 0  # transposition table moves searched (before any move generation)
+        self.eval_cache_probes = 0
+        self.eval_cache_hits = 0
+        # moves (or nodes, for reverse futility and null move) skipped by pruning
+        self.pruned = {'DELTA': 0, 'FUTILITY': 0, 'REVERSE_FUTILITY': 0, 'NULL_MOVE': 0}
+        # root searches repeated because the score fell outside the aspiration window
+        self.aspiration_researches = {'FAIL_LOW': 0, 'FAIL_HIGH': 0}
+        # quiet moves searched at reduced depth, and those of them searched again at full depth
+        self.late_move_reductions = 0
+        self.late_move_researches = 0
+        self.helper_nodes_visited = 0  # nodes of the lazy SMP helpers
 
     def reset(self):
         """Reset the statistics to their initial state."""
         self.nodes_visited = 0
         self.q_nodes_visited = 0
         self.evaluation = 0.0
+        self.depth_reached = 0
+        self.cutoffs = {'TT': 0, 'CAPTURE': 0, 'QUIET': 0, 'BAD_CAPTURE': 0}
+        self.first_move_cutoffs = 0
+        self.hash_moves = 0
+        self.eval_cache_probes = 0
+        self.eval_cache_hits = 0
+        self.pruned = {'DELTA': 0, 'FUTILITY': 0, 'REVERSE_FUTILITY': 0, 'NULL_MOVE': 0}
+        self.aspiration_researches = {'FAIL_LOW': 0, 'FAIL_HIGH': 0}
+        self.late_move_reductions = 0
+        self.late_move_researches = 0
+        self.helper_nodes_visited = 0
+
+    def first_move_cutoff_rate(self) -> float:
+        """Share of the beta cutoffs made by the first move, a measure of the move ordering"""
+        total_cutoffs = sum(self.cutoffs.values())
+        return self.first_move_cutoffs / total_cutoffs if total_cutoffs else 0.0
+
+    def hash_move_cutoff_rate(self) -> float:
+        """Share of the searched nodes cut off by the transposition table move"""
+        nodes = self.nodes_visited + self.q_nodes_visited
+        return self.cutoffs['TT'] / nodes if nodes else 0.0
+
+    def eval_cache_hit_rate(self) -> float:
+        return self.eval_cache_hits / self.eval_cache_probes if self.eval_cache_probes else 0.0
 
     def __str__(self):
         """Return a formatted string for the statistics."""
-        return f"Nodes Visited: {self.nodes_visited}\nQ Nodes Visited: {self.q_nodes_visited}\nEvaluation: {self.evaluation:.2f}"
+        cutoffs = ", ".join(f"{stage} {count}" for stage, count in self.cutoffs.items())
+        pruned = ", ".join(f"{kind} {count}" for kind, count in self.pruned.items())
+        researches = ", ".join(f"{kind} {count}" for kind, count in self.aspiration_researches.items())
+        return (f"Nodes Visited: {self.nodes_visited}\nQ Nodes Visited: {self.q_nodes_visited}\n"
+                f"Cutoffs: {cutoffs} (first move {self.first_move_cutoff_rate():.1%})\n"
+                f"Hash Move Cutoffs: {self.cutoffs['TT']}/{self.hash_moves} ({self.hash_move_cutoff_rate():.1%} of nodes)\n"
+                f"Pruned: {pruned}\nAspiration Re-searches: {researches}\n"
+                f"Late Move Reductions: {self.late_move_reductions} ({self.late_move_researches} re-searched)\n"
+                f"Eval Cache Hits: {self.eval_cache_hits}/{self.eval_cache_probes} ({self.eval_cache_hit_rate():.1%})\n"
+                f"Depth Reached: {self.depth_reached}\nEvaluation: {self.evaluation:.2f}")
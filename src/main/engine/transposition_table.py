@@ -1,8 +1,100 @@
+from array import array
 
 
 class TTEntry:
+    # best_move is a packed move (see move_state), None if no move was searched
     def __init__(self, value, depth, flag, best_move=None):
         self.value = value
         self.depth = depth
         self.flag = flag
         self.best_move = best_move
+
+
+# Entry flags are stored as their index
+FLAGS = ('EXACT', 'LOWERBOUND', 'UPPERBOUND')
+FLAG_INDEX = {flag: index for index, flag in enumerate(FLAGS)}
+# bytes per entry: key, value, depth, flag, move, generation
+ENTRY_BYTES = 8 + 4 + 1 + 1 + 4 + 1
+
+
+# Probe / store interface of the engine's transposition tables (this one and SharedTranspositionTable):
+#   probe(key) -> TTEntry or None, store(key, value, depth, flag, best_move), end_search() after every play_move
+class TranspositionTable:
+    """
+    Fixed-size transposition table of size_mb, the entries packed into preallocated arrays.
+    A key maps to a bucket of bucket_size entries. A full bucket replaces its least worth entry: the shallowest,
+    with every search (generation) since the entry was written counting as AGE_WEIGHT plies less depth.
+    The same position is overwritten by a result at least as deep, an exact one, or any result of a later search.
+    """
+    AGE_WEIGHT = 4
+
+    def __init__(self, size_mb=16, bucket_size=4):
+        # as many buckets as fit in size_mb, the bucket of a key is key % buckets
+        self.buckets = max((size_mb << 20) // (ENTRY_BYTES * bucket_size), 1)
+        self.bucket_size = bucket_size
+        self.size = self.buckets * bucket_size
+        # key 0 marks an empty entry, depth is signed (quiescence entries are stored below 0)
+        self.keys = array('Q', bytes(8 * self.size))
+        self.values = array('i', bytes(4 * self.size))
+        self.depths = array('b', bytes(self.size))
+        self.flags = array('B', bytes(self.size))
+        self.moves = array('I', bytes(4 * self.size))
+        self.generations = array('B', bytes(self.size))
+        self.generation = 0
+
+    def __len__(self):
+        """Number of used entries"""
+        return self.size - self.keys.count(0)
+
+    def probe(self, key: int) -> TTEntry | None:
+        keys = self.keys
+        start = (key % self.buckets) * self.bucket_size
+        for index in range(start, start + self.bucket_size):
+            if keys[index] == key:
+                # still in use, so it ages from now on
+                self.generations[index] = self.generation
+                return TTEntry(self.values[index], self.depths[index], FLAGS[self.flags[index]],
+                               self.moves[index] or None)
+        return None
+
+    def store(self, key: int, value: int, depth: int, flag: str, best_move: int | None = None):
+        keys = self.keys
+        generation, generations, depths = self.generation, self.generations, self.depths
+        start = (key % self.buckets) * self.bucket_size
+        # the same position, else the first empty entry, else the least worth one.
+        # Buckets fill from the front and entries are never removed, so the position can't come after an empty entry
+        replace_index = start
+        replace_worth = None
+        for index in range(start, start + self.bucket_size):
+            entry_key = keys[index]
+            if entry_key == key or entry_key == 0:
+                replace_index = index
+                break
+            worth = depths[index] - self.AGE_WEIGHT * ((generation - generations[index]) & 0xFF)
+            if replace_worth is None or worth < replace_worth:
+                replace_index, replace_worth = index, worth
+
+        if keys[replace_index] == key:
+            # A shallower bound of this search doesn't replace a deeper result (quiescence entries would otherwise
+            # wipe out the main search ones), it only leaves its move
+            if depth < depths[replace_index] and generations[replace_index] == generation and flag != 'EXACT':
+                if best_move is not None:
+                    self.moves[replace_index] = best_move
+                return
+            # A result without a move keeps the move found earlier for the same position
+            if best_move is None:
+                best_move = self.moves[replace_index] or None
+        keys[replace_index] = key
+        self.values[replace_index] = value
+        self.depths[replace_index] = depth
+        self.flags[replace_index] = FLAG_INDEX[flag]
+        self.moves[replace_index] = best_move or 0
+        self.generations[replace_index] = self.generation
+
+    def end_search(self):
+        """Entries of the searches before this one lose worth, nothing is removed or sorted"""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self):
+        self.keys[:] = array('Q', bytes(8 * self.size))
+        self.generation = 0
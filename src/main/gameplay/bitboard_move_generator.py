@@ -0,0 +1,240 @@
+from src.main.utils.constants import *
+from .bitboard_state import BitboardState, BOARD_MASK, MAILBOX_BIT
+from .move_state import *
+
+
+# bit index -> mailbox index
+BIT_TO_MAILBOX = BOARD_SQUARES
+
+FIRST_COL_MASK = sum(1 << (row * BOARD_COL) for row in range(BOARD_ROW))
+LAST_COL_MASK = FIRST_COL_MASK << (BOARD_COL - 1)
+FIRST_ROW_MASK = (1 << BOARD_COL) - 1
+LAST_ROW_MASK = FIRST_ROW_MASK << (BOARD_COL * (BOARD_ROW - 1))
+
+DIAGONAL_DELTAS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+STRAIGHT_DELTAS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+# Move generator for BitboardState, produces the same moves as MoveGenerator
+# (in piece type order rather than board scan order), with the same interface so the engine can use it
+# on BitboardState boards: Engine(move_generator=BitboardMoveGenerator())
+class BitboardMoveGenerator:
+    def __init__(self):
+        self.KNIGHT_ATTACKS = self.generate_step_attacks([
+            (-2, -1), (-2, +1), (-1, -2), (-1, +2),
+            (+1, -2), (+1, +2), (+2, -1), (+2, +1)
+        ])
+        self.KING_ATTACKS = self.generate_step_attacks([
+            (dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc
+        ])
+        self.BISHOP_MASKS, self.BISHOP_ATTACKS = self.generate_slider_attacks(DIAGONAL_DELTAS)
+        self.ROOK_MASKS, self.ROOK_ATTACKS = self.generate_slider_attacks(STRAIGHT_DELTAS)
+        self.QUIET_MOVES = self.generate_quiet_move_table()
+
+    def generate_all_moves(self, board_state: BitboardState) -> list[int]:
+        own = board_state.white_occupancy if board_state.is_white_turn else board_state.black_occupancy
+        return self.generate_moves(board_state, ~own & BOARD_MASK, BOARD_MASK, True)
+
+    def generate_capture_moves(self, board_state: BitboardState, include_promotions=False) -> list[int]:
+        """
+        Generate only capture moves for quiescence search, plus quiet queen promotions if include_promotions.
+        Targets come straight from the enemy occupancy, in the same order as filtering generate_all_moves.
+        """
+        enemy = board_state.black_occupancy if board_state.is_white_turn else board_state.white_occupancy
+        push_mask = self.promotion_row(board_state) if include_promotions else 0
+        return self.generate_moves(board_state, enemy, push_mask, True)
+
+    def generate_quiet_moves(self, board_state: BitboardState) -> list[int]:
+        """Non-capture, non-promotion moves, the complement of generate_capture_moves(include_promotions=True)"""
+        empty = ~(board_state.white_occupancy | board_state.black_occupancy) & BOARD_MASK
+        return self.generate_moves(board_state, empty, ~self.promotion_row(board_state) & BOARD_MASK, False)
+
+    def is_pseudo_legal(self, board_state: BitboardState, move: int) -> bool:
+        """Whether a stored move (e.g. a transposition table move) can be played in this position"""
+        return move in self.generate_square_moves(board_state, move & MOVE_SQUARE_MASK)
+
+    def generate_piece_moves(self, board_state: BitboardState, pos) -> list[int]:
+        return self.generate_square_moves(board_state, MAILBOX_INDEX[pos[0]][pos[1]])
+
+    def generate_square_moves(self, board_state: BitboardState, index: int) -> list[int]:
+        """Moves of the piece on a mailbox index, empty if it isn't a piece of the side to move"""
+        own = board_state.white_occupancy if board_state.is_white_turn else board_state.black_occupancy
+        from_mask = MAILBOX_BIT[index] & own
+        if not from_mask:
+            return []
+        return self.generate_moves(board_state, ~own & BOARD_MASK, BOARD_MASK, True, from_mask)
+
+    def promotion_row(self, board_state: BitboardState) -> int:
+        return FIRST_ROW_MASK if board_state.is_white_turn else LAST_ROW_MASK
+
+
+    def generate_moves(self, board_state: BitboardState, target_mask: int, push_mask: int, pawn_captures: bool,
+                       from_mask: int = BOARD_MASK) -> list[int]:
+        """
+        Moves of the pieces on from_mask: piece moves onto target_mask, pawn pushes onto push_mask
+        and, with pawn_captures, pawn captures
+        """
+        squares = board_state.squares
+        piece_boards = board_state.piece_boards
+        occupancy = board_state.white_occupancy | board_state.black_occupancy
+        sign = 1 if board_state.is_white_turn else -1
+        moves = self.get_pawn_moves(board_state, push_mask, pawn_captures, from_mask)
+
+        # Knights and kings read their targets straight from the attack masks
+        for piece, attack_table in ((WHITE_KNIGHT * sign, self.KNIGHT_ATTACKS), (WHITE_KING * sign, self.KING_ATTACKS)):
+            pieces = piece_boards[piece + 6] & from_mask
+            while pieces:
+                low = pieces & -pieces
+                pieces ^= low
+                bit = low.bit_length() - 1
+                quiet_moves = self.QUIET_MOVES[piece + 6][bit]
+                targets = attack_table[bit] & target_mask
+                while targets:
+                    low = targets & -targets
+                    targets ^= low
+                    target_bit = low.bit_length() - 1
+                    captured = squares[BIT_TO_MAILBOX[target_bit]]
+                    moves.append(quiet_moves[target_bit] | (captured & MOVE_PIECE_MASK) << MOVE_CAPTURED_SHIFT)
+
+        # Sliders look up their rays by occupancy, queens go through both the rook and the bishop tables
+        queens = piece_boards[WHITE_QUEEN * sign + 6]
+        for pieces, masks, attack_tables in (
+                (piece_boards[WHITE_ROOK * sign + 6] | queens, self.ROOK_MASKS, self.ROOK_ATTACKS),
+                (piece_boards[WHITE_BISHOP * sign + 6] | queens, self.BISHOP_MASKS, self.BISHOP_ATTACKS)):
+            pieces &= from_mask
+            while pieces:
+                low = pieces & -pieces
+                pieces ^= low
+                bit = low.bit_length() - 1
+                piece = squares[BIT_TO_MAILBOX[bit]]
+                quiet_moves = self.QUIET_MOVES[piece + 6][bit]
+                targets = attack_tables[bit][occupancy & masks[bit]] & target_mask
+                while targets:
+                    low = targets & -targets
+                    targets ^= low
+                    target_bit = low.bit_length() - 1
+                    captured = squares[BIT_TO_MAILBOX[target_bit]]
+                    moves.append(quiet_moves[target_bit] | (captured & MOVE_PIECE_MASK) << MOVE_CAPTURED_SHIFT)
+
+        return moves
+
+
+    # Pawns are generated set-wise: shift the whole pawn board one row and read off the targets
+    def get_pawn_moves(self, board_state: BitboardState, push_mask: int = BOARD_MASK, captures=True,
+                       from_mask: int = BOARD_MASK) -> list[int]:
+        squares = board_state.squares
+        if board_state.is_white_turn:
+            piece = WHITE_PAWN
+            pawns = board_state.piece_boards[WHITE_PAWN + 6] & from_mask
+            enemy = board_state.black_occupancy
+            pushes = (pawns >> BOARD_COL) & ~(board_state.white_occupancy | enemy)
+            left_captures = ((pawns & ~FIRST_COL_MASK) >> (BOARD_COL + 1)) & enemy
+            right_captures = ((pawns & ~LAST_COL_MASK) >> (BOARD_COL - 1)) & enemy
+            # bit delta from target back to pawn
+            push_delta, left_delta, right_delta = BOARD_COL, BOARD_COL + 1, BOARD_COL - 1
+        else:
+            piece = BLACK_PAWN
+            pawns = board_state.piece_boards[BLACK_PAWN + 6] & from_mask
+            enemy = board_state.white_occupancy
+            pushes = (pawns << BOARD_COL) & ~(board_state.black_occupancy | enemy) & BOARD_MASK
+            left_captures = ((pawns & ~FIRST_COL_MASK) << (BOARD_COL - 1)) & enemy
+            right_captures = ((pawns & ~LAST_COL_MASK) << (BOARD_COL + 1)) & enemy
+            push_delta, left_delta, right_delta = -BOARD_COL, -(BOARD_COL - 1), -(BOARD_COL + 1)
+
+        quiet_moves = self.QUIET_MOVES[piece + 6]
+        moves = []
+        pushes &= push_mask
+        while pushes:
+            low = pushes & -pushes
+            pushes ^= low
+            bit = low.bit_length() - 1
+            moves.append(quiet_moves[bit + push_delta][bit])
+
+        if not captures:
+            return moves
+        for targets, delta in ((left_captures, left_delta), (right_captures, right_delta)):
+            while targets:
+                low = targets & -targets
+                targets ^= low
+                bit = low.bit_length() - 1
+                moves.append(quiet_moves[bit + delta][bit]
+                             | (squares[BIT_TO_MAILBOX[bit]] & MOVE_PIECE_MASK) << MOVE_CAPTURED_SHIFT)
+        return moves
+
+
+    # Attack table generation
+    def generate_quiet_move_table(self):
+        """
+        Packed move for every non-capture, indexed by [piece + 6][from bit][to bit].
+        A capture is the quiet move with the captured piece or-ed in.
+        """
+        quiet_moves = [None] * 13
+        bits = range(BOARD_ROW * BOARD_COL)
+        for piece in PIECE_SYMBOLS:
+            quiet_moves[piece + 6] = [
+                [encode_move(BIT_TO_MAILBOX[pre_bit], BIT_TO_MAILBOX[new_bit], piece, EMPTY,
+                             self.is_promotion(piece, new_bit)) for new_bit in bits]
+                for pre_bit in bits
+            ]
+        return quiet_moves
+
+    def is_promotion(self, piece: int, bit: int) -> bool:
+        if piece == WHITE_PAWN:
+            return bool((1 << bit) & FIRST_ROW_MASK)
+        if piece == BLACK_PAWN:
+            return bool((1 << bit) & LAST_ROW_MASK)
+        return False
+
+    def generate_step_attacks(self, deltas) -> list[int]:
+        """Attack mask for every bit index, for pieces that move one step (knight, king)."""
+        attacks = []
+        for row in range(BOARD_ROW):
+            for col in range(BOARD_COL):
+                mask = 0
+                for dr, dc in deltas:
+                    nr, nc = row + dr, col + dc
+                    if 0 <= nr < BOARD_ROW and 0 <= nc < BOARD_COL:
+                        mask |= 1 << (nr * BOARD_COL + nc)
+                attacks.append(mask)
+        return attacks
+
+    def generate_slider_attacks(self, deltas):
+        """
+        For every bit index: the mask of all ray squares, and a dict from
+        (occupancy & mask) to the attack mask (rays up to and including the first blocker).
+        """
+        masks = []
+        attack_tables = []
+        for row in range(BOARD_ROW):
+            for col in range(BOARD_COL):
+                mask = 0
+                for dr, dc in deltas:
+                    nr, nc = row + dr, col + dc
+                    while 0 <= nr < BOARD_ROW and 0 <= nc < BOARD_COL:
+                        mask |= 1 << (nr * BOARD_COL + nc)
+                        nr, nc = nr + dr, nc + dc
+
+                # Enumerate every subset of the mask (carry-rippler)
+                table = {}
+                occupancy = 0
+                while True:
+                    table[occupancy] = self.walk_rays(row, col, deltas, occupancy)
+                    occupancy = (occupancy - mask) & mask
+                    if occupancy == 0:
+                        break
+
+                masks.append(mask)
+                attack_tables.append(table)
+        return masks, attack_tables
+
+    def walk_rays(self, row: int, col: int, deltas, occupancy: int) -> int:
+        attacks = 0
+        for dr, dc in deltas:
+            nr, nc = row + dr, col + dc
+            while 0 <= nr < BOARD_ROW and 0 <= nc < BOARD_COL:
+                bit = 1 << (nr * BOARD_COL + nc)
+                attacks |= bit
+                if occupancy & bit:
+                    break
+                nr, nc = nr + dr, nc + dc
+        return attacks
@@ -0,0 +1,90 @@
+from src.main.utils.constants import *
+from .board_state import BoardState
+from .move_state import *
+
+
+# Bit index of a square is row * BOARD_COL + col, so bit order is row-major like BOARD_SQUARES
+BOARD_MASK = (1 << (BOARD_ROW * BOARD_COL)) - 1
+# mailbox index -> single bit mask, 0 for sentinel squares
+MAILBOX_BIT = [0] * MAILBOX_SIZE
+for _bit, _index in enumerate(BOARD_SQUARES):
+    MAILBOX_BIT[_index] = 1 << _bit
+
+
+# Bitboard variant of BoardState.
+# The mailbox squares are still kept (and shared with evaluation, hashing and the UI adapter),
+# the bitboards are updated next to them in make_move/undo_move.
+class BitboardState(BoardState):
+    def load_board(self, board: list[list[int]]):
+        super().load_board(board)
+        self.load_bitboards()
+
+    def load_bitboards(self):
+        """Rebuild all bitboards from the mailbox squares"""
+        self.piece_boards = [0] * 13  # indexed by piece + 6
+        self.white_occupancy = 0
+        self.black_occupancy = 0
+
+        for bit, index in enumerate(BOARD_SQUARES):
+            piece = self.squares[index]
+            if piece == EMPTY:
+                continue
+            self.piece_boards[piece + 6] |= 1 << bit
+            if piece > 0:
+                self.white_occupancy |= 1 << bit
+            else:
+                self.black_occupancy |= 1 << bit
+
+    @property
+    def occupancy(self) -> int:
+        return self.white_occupancy | self.black_occupancy
+
+    def own_occupancy(self) -> int:
+        return self.white_occupancy if self.is_white_turn else self.black_occupancy
+
+    def enemy_occupancy(self) -> int:
+        return self.black_occupancy if self.is_white_turn else self.white_occupancy
+
+    def copy(self):
+        new_state = super().copy()
+        new_state.load_bitboards()
+        return new_state
+
+
+    def make_move(self, move: int):
+        super().make_move(move)
+        # The placed piece differs from the moved piece on promotion
+        placed_piece = self.squares[(move >> MOVE_TO_SHIFT) & MOVE_SQUARE_MASK]
+        self._update_bitboards(move, placed_piece)
+
+    def undo_move(self):
+        if not self.move_history:
+            return
+
+        last_move = self.move_history[-1]
+        placed_piece = self.squares[(last_move >> MOVE_TO_SHIFT) & MOVE_SQUARE_MASK]
+        super().undo_move()
+        # Every update is an xor, so undoing is the same update again
+        self._update_bitboards(last_move, placed_piece)
+
+
+    def _update_bitboards(self, move: int, placed_piece: int):
+        pre_bit = MAILBOX_BIT[move & MOVE_SQUARE_MASK]
+        new_bit = MAILBOX_BIT[(move >> MOVE_TO_SHIFT) & MOVE_SQUARE_MASK]
+        moved_piece = PACKED_PIECE[(move >> MOVE_PIECE_SHIFT) & MOVE_PIECE_MASK]
+        captured_piece = PACKED_PIECE[(move >> MOVE_CAPTURED_SHIFT) & MOVE_PIECE_MASK]
+
+        piece_boards = self.piece_boards
+        piece_boards[moved_piece + 6] ^= pre_bit
+        piece_boards[placed_piece + 6] ^= new_bit
+
+        if moved_piece > 0:
+            self.white_occupancy ^= pre_bit | new_bit
+            if captured_piece:
+                piece_boards[captured_piece + 6] ^= new_bit
+                self.black_occupancy ^= new_bit
+        else:
+            self.black_occupancy ^= pre_bit | new_bit
+            if captured_piece:
+                piece_boards[captured_piece + 6] ^= new_bit
+                self.white_occupancy ^= new_bit
@@ -1,7 +1,6 @@
-import copy
-
 from src.main.utils.constants import *
-from .move_state import MoveState
+from src.main.utils.engine_constants import PIECE_MATERIAL, PIECE_SQUARE_VALUE
+from .move_state import *
 
 
 
@@ -9,158 +8,246 @@ from .move_state import MoveState
 # needs board_state flipping in the ui
 class BoardState:
     def __init__(self, is_white_turn=True):
-        self.board = copy.deepcopy(WHITE_PLAYER_PERSPECTIVE)
+        # Flat mailbox board, see MAILBOX_INDEX for the (row, col) -> index mapping
+        self.squares = [OFF_BOARD] * MAILBOX_SIZE
+        self.load_board(WHITE_PLAYER_PERSPECTIVE)
         self.is_white_turn = is_white_turn
         self.move_history = []
+        # hash of the position before every move in move_history, for repetition detection
+        self.key_stack = []
         self._hash = None  # Cache for the hash value
 
+    @property
+    def board(self) -> list[list[int]]:
+        """2D (row, col) view of the mailbox, for the UI and printing"""
+        squares = self.squares
+        return [[squares[index] for index in row] for row in MAILBOX_INDEX]
+
+    @board.setter
+    def board(self, board: list[list[int]]):
+        self.load_board(board)
+
+    def load_board(self, board: list[list[int]]):
+        """Fill the playable squares from a 2D board in white player perspective"""
+        for row in range(BOARD_ROW):
+            for col in range(BOARD_COL):
+                self.squares[MAILBOX_INDEX[row][col]] = board[row][col]
+        self.load_piece_lists()
+        self.load_evaluation()
+        self._hash = None
+
+    def load_piece_lists(self):
+        """Rebuild the per-color sets of occupied squares from the mailbox"""
+        self.white_pieces = {index for index in BOARD_SQUARES if self.squares[index] > 0}
+        self.black_pieces = {index for index in BOARD_SQUARES if self.squares[index] < 0}
+
+    def load_evaluation(self):
+        """
+        Recompute the running evaluation totals from the mailbox.
+        material and piece_square (material plus position bonus) are white minus black,
+        piece_counts is indexed by piece + 6.
+        """
+        self.material = 0
+        self.piece_square = 0
+        self.piece_counts = [0] * 13
+        for index in BOARD_SQUARES:
+            piece = self.squares[index]
+            if piece != EMPTY:
+                self.material += PIECE_MATERIAL[piece + 6]
+                self.piece_square += PIECE_SQUARE_VALUE[piece + 6][index]
+                self.piece_counts[piece + 6] += 1
+
+    def own_pieces(self) -> list[int]:
+        """
+        Squares occupied by the side to move, in mailbox order. The sets iterate in an order that depends on
+        their history, sorting keeps move generation (and so node counts and ties) the same for equal positions.
+        """
+        return sorted(self.white_pieces if self.is_white_turn else self.black_pieces)
+
+    def get_piece(self, row: int, col: int) -> int:
+        return self.squares[MAILBOX_INDEX[row][col]]
+
     def __hash__(self):
         if self._hash is not None:
             return self._hash
-            
+
         h = 0
-        for row in range(len(self.board)):
-            for col in range(len(self.board[0])):
-                piece = self.board[row][col]
-                if piece != EMPTY:
-                    # Use piece type, position, and color to generate hash
-                    h ^= self._zobrist_hash(piece, row, col)
-    
+        squares = self.squares
+        for index in BOARD_SQUARES:
+            piece = squares[index]
+            if piece != EMPTY:
+                # Use piece type, position, and color to generate hash
+                h ^= self._zobrist_hash(piece, index)
+
         # Include turn in the hash
         if self.is_white_turn:
             h ^= self._zobrist_turn_hash()
-        
+
         self._hash = h
         return h
 
-    def _zobrist_hash(self, piece: int, row: int, col: int) -> int:
-        return ZOBRIST_PIECE_SQUARE[piece + 6][row][col]  # +6 to make negative indices positive
+    def _zobrist_hash(self, piece: int, index: int) -> int:
+        return ZOBRIST_PIECE_INDEX[piece + 6][index]  # +6 to make negative indices positive
 
     def _zobrist_turn_hash(self) -> int:
         return ZOBRIST_TURN
-    
-    
+
+
 
     def print_board(self):
         for row in self.board:
             print(' '.join(PIECE_SYMBOLS.get(cell, '.') for cell in row))
-            
+
     def copy(self):
-        new_state = BoardState(self.is_white_turn)
-        new_state.board = [[cell for cell in row] for row in self.board]
-        new_state.move_history = [move.copy() for move in self.move_history]
+        new_state = self.__class__(self.is_white_turn)
+        new_state.squares = self.squares[:]
+        new_state.white_pieces = set(self.white_pieces)
+        new_state.black_pieces = set(self.black_pieces)
+        new_state.material = self.material
+        new_state.piece_square = self.piece_square
+        new_state.piece_counts = self.piece_counts[:]
+        new_state.move_history = self.move_history[:]
+        new_state.key_stack = self.key_stack[:]
         return new_state
-    
-
-    def make_move(self, move: MoveState):
-        pre_row, pre_col = move.pre_pos
-        new_row, new_col = move.new_pos
 
-        # Move the piece
-        self.board[new_row][new_col] = move.moved_piece
-        self.board[pre_row][pre_col] = EMPTY
 
-        # Handle promotion
-        if move.is_promoted:
-            if self.is_white_turn:
-                self.board[new_row][new_col] = WHITE_QUEEN
-            else:
-                self.board[new_row][new_col] = BLACK_QUEEN
+    def make_move(self, move: int):
+        """Make a packed move (see move_state for the layout)"""
+        pre_index = move & MOVE_SQUARE_MASK
+        new_index = (move >> MOVE_TO_SHIFT) & MOVE_SQUARE_MASK
+        moved_piece = PACKED_PIECE[(move >> MOVE_PIECE_SHIFT) & MOVE_PIECE_MASK]
+        captured_piece = PACKED_PIECE[(move >> MOVE_CAPTURED_SHIFT) & MOVE_PIECE_MASK]
+        self.key_stack.append(self.__hash__())
+
+        # Move the piece (promotion keeps the color of the pawn)
+        placed_piece = moved_piece
+        if move & MOVE_PROMOTION_FLAG:
+            placed_piece = WHITE_QUEEN if moved_piece > 0 else BLACK_QUEEN
+        self.squares[new_index] = placed_piece
+        self.squares[pre_index] = EMPTY
+
+        # Update the piece lists
+        if moved_piece > 0:
+            own_pieces, enemy_pieces = self.white_pieces, self.black_pieces
+        else:
+            own_pieces, enemy_pieces = self.black_pieces, self.white_pieces
+        own_pieces.remove(pre_index)
+        own_pieces.add(new_index)
+        if captured_piece:
+            enemy_pieces.remove(new_index)
+
+        # Update the running evaluation totals
+        self.piece_square += (PIECE_SQUARE_VALUE[placed_piece + 6][new_index]
+                              - PIECE_SQUARE_VALUE[moved_piece + 6][pre_index])
+        if captured_piece:
+            self.material -= PIECE_MATERIAL[captured_piece + 6]
+            self.piece_square -= PIECE_SQUARE_VALUE[captured_piece + 6][new_index]
+            self.piece_counts[captured_piece + 6] -= 1
+        if placed_piece != moved_piece:
+            self.material += PIECE_MATERIAL[placed_piece + 6] - PIECE_MATERIAL[moved_piece + 6]
+            self.piece_counts[placed_piece + 6] += 1
+            self.piece_counts[moved_piece + 6] -= 1
 
         # Save the move to history
         self.move_history.append(move)
 
         # Switch turn and update hash
         self.is_white_turn = not self.is_white_turn
-        self._hash = self._update_hash_for_move(move)
+        self._hash ^= (ZOBRIST_PIECE_INDEX[moved_piece + 6][pre_index]
+                       ^ ZOBRIST_PIECE_INDEX[placed_piece + 6][new_index]
+                       ^ ZOBRIST_TURN)
+        if captured_piece:
+            self._hash ^= ZOBRIST_PIECE_INDEX[captured_piece + 6][new_index]
 
     def undo_move(self):
         if not self.move_history:
             return
 
         last_move = self.move_history.pop()
-        pre_row, pre_col = last_move.pre_pos
-        new_row, new_col = last_move.new_pos
-
-        # Update hash before board changes
-        self._hash = self._update_hash_for_undo(last_move)
+        pre_index = last_move & MOVE_SQUARE_MASK
+        new_index = (last_move >> MOVE_TO_SHIFT) & MOVE_SQUARE_MASK
+        moved_piece = PACKED_PIECE[(last_move >> MOVE_PIECE_SHIFT) & MOVE_PIECE_MASK]
+        captured_piece = PACKED_PIECE[(last_move >> MOVE_CAPTURED_SHIFT) & MOVE_PIECE_MASK]
+
+        # The piece on new_index might be promoted
+        placed_piece = self.squares[new_index]
+
+        # The hash of the position before the move was kept
+        self._hash = self.key_stack.pop()
+
+        # Restore the running evaluation totals
+        self.piece_square += (PIECE_SQUARE_VALUE[moved_piece + 6][pre_index]
+                              - PIECE_SQUARE_VALUE[placed_piece + 6][new_index])
+        if captured_piece:
+            self.material += PIECE_MATERIAL[captured_piece + 6]
+            self.piece_square += PIECE_SQUARE_VALUE[captured_piece + 6][new_index]
+            self.piece_counts[captured_piece + 6] += 1
+        if placed_piece != moved_piece:
+            self.material += PIECE_MATERIAL[moved_piece + 6] - PIECE_MATERIAL[placed_piece + 6]
+            self.piece_counts[moved_piece + 6] += 1
+            self.piece_counts[placed_piece + 6] -= 1
 
         # Also handles pawn promotion (moved_piece will be pawn even for promotion)
-        self.board[pre_row][pre_col] = last_move.moved_piece
+        self.squares[pre_index] = moved_piece
 
         # Restore captured piece or empty
-        if last_move.captured_piece:
-            self.board[new_row][new_col] = last_move.captured_piece
+        self.squares[new_index] = captured_piece
+
+        # Restore the piece lists
+        if moved_piece > 0:
+            own_pieces, enemy_pieces = self.white_pieces, self.black_pieces
         else:
-            self.board[new_row][new_col] = EMPTY
+            own_pieces, enemy_pieces = self.black_pieces, self.white_pieces
+        own_pieces.remove(new_index)
+        own_pieces.add(pre_index)
+        if captured_piece:
+            enemy_pieces.add(new_index)
 
         # Switch turn back
         self.is_white_turn = not self.is_white_turn
 
 
+    def make_null_move(self):
+        """Pass the turn without moving, NULL_MOVE goes to the move history"""
+        self.move_history.append(NULL_MOVE)
+        self.key_stack.append(self.__hash__())
+        self.is_white_turn = not self.is_white_turn
+        self._hash ^= ZOBRIST_TURN
+
+    def undo_null_move(self):
+        self.move_history.pop()
+        self.is_white_turn = not self.is_white_turn
+        self._hash = self.key_stack.pop()
+
+    def is_repetition(self, times: int = 1) -> bool:
+        """
+        Whether the current position occurred at least times times before. Only looks back to the last capture,
+        pawn move or null move, no position before one of those can come back.
+        """
+        key = self.__hash__()
+        key_stack = self.key_stack
+        move_history = self.move_history
+        for move_number in range(len(move_history) - 1, -1, -1):
+            move = move_history[move_number]
+            if (move == NULL_MOVE or move & MOVE_CAPTURED_MASK
+                    or abs(PACKED_PIECE[(move >> MOVE_PIECE_SHIFT) & MOVE_PIECE_MASK]) == WHITE_PAWN):
+                return False
+            if key_stack[move_number] == key:
+                times -= 1
+                if times == 0:
+                    return True
+        return False
+
+
     # Needs to check after make_move
     def is_check_mate(self):
 
-        last_move = self.move_history[-1] if self.move_history else None
-
-        if not last_move:
+        if not self.move_history:
             return False
 
         # If the last move captured the king, it's checkmate
-        captured_piece = last_move.captured_piece
+        captured_piece = move_captured_piece(self.move_history[-1])
         if captured_piece == WHITE_KING or captured_piece == BLACK_KING:
             return True
 
         return False
-
-    def _update_hash_for_move(self, move: MoveState) -> int:
-        """Updates hash value for making a move"""
-        if self._hash is None:
-            return self.__hash__()
-            
-        h = self._hash
-        pre_row, pre_col = move.pre_pos
-        new_row, new_col = move.new_pos
-
-        # Remove piece from original position
-        h ^= self._zobrist_hash(move.moved_piece, pre_row, pre_col)
-        
-        # Handle captured piece if exists
-        if move.captured_piece:
-            h ^= self._zobrist_hash(move.captured_piece, new_row, new_col)
-        
-        # Add piece to new position (handle promotion)
-        piece_to_add = move.moved_piece
-        if move.is_promoted:
-            piece_to_add = WHITE_QUEEN if self.is_white_turn else BLACK_QUEEN
-        h ^= self._zobrist_hash(piece_to_add, new_row, new_col)
-        
-        # Toggle turn
-        h ^= self._zobrist_turn_hash()
-        
-        return h
-
-    def _update_hash_for_undo(self, move: MoveState) -> int:
-        """Updates hash value for undoing a move"""
-        if self._hash is None:
-            return self.__hash__()
-            
-        h = self._hash
-        pre_row, pre_col = move.pre_pos
-        new_row, new_col = move.new_pos
-
-        # Remove piece from current position (might be promoted)
-        current_piece = self.board[new_row][new_col]
-        h ^= self._zobrist_hash(current_piece, new_row, new_col)
-        
-        # Add piece back to original position
-        h ^= self._zobrist_hash(move.moved_piece, pre_row, pre_col)
-        
-        # Add back captured piece if any
-        if move.captured_piece:
-            h ^= self._zobrist_hash(move.captured_piece, new_row, new_col)
-            
-        # Toggle turn back
-        h ^= self._zobrist_turn_hash()
-        
-        return h
\ No newline at end of file
@@ -1,6 +1,7 @@
 from src.main.gameplay.board_state import BoardState
 from src.main.gameplay.move_generator import MoveGenerator
 from src.main.gameplay.move_state import MoveState
+from src.main.utils.constants import BOARD_ROW
 from src.main.utils.utils import is_white, is_black
 
 
@@ -25,10 +26,10 @@ class ChessGame:
         return self.board_state.is_white_turn == self.player_white_turn
 
     def get_move_history(self):
-        return self.board_state.move_history
+        return [MoveState.from_packed(move) for move in self.board_state.move_history]
 
     def get_last_move(self):
-        return self.board_state.move_history[-1] if self.board_state.move_history else None
+        return MoveState.from_packed(self.board_state.move_history[-1]) if self.board_state.move_history else None
 
     def reset_temp(self):
         self.selected_pos = None
@@ -38,7 +39,9 @@ class ChessGame:
     def initiate_move(self, pos):
         """Handle a click. Returns true if a any valid moves found, false otherwise.."""
         self.selected_pos = pos
-        self.valid_moves = self.move_generator.generate_piece_moves(self.board_state,pos)
+        self.valid_moves = [
+            MoveState.from_packed(move) for move in self.move_generator.generate_piece_moves(self.board_state, pos)
+        ]
         if self.valid_moves:
             return True
         else:
@@ -58,7 +61,7 @@ class ChessGame:
         self.valid_moves = []
 
         if valid:
-            self.board_state.make_move(move)
+            self.board_state.make_move(move.to_packed())
             return True
         return False
 
@@ -66,8 +69,9 @@ class ChessGame:
     def play_ai_move(self):
         """Call engine to play a move."""
         move = self.engine.play_move(self.board_state.copy())
-        print(move)
         self.board_state.make_move(move)
+        move = MoveState.from_packed(move)
+        print(move)
         return move
 
 
@@ -89,14 +93,14 @@ class ChessGame:
         from_row, from_col = from_pos
         to_row, to_col = to_pos
 
-        moved_piece = self.board_state.board[from_row][from_col]
-        captured_piece = self.board_state.board[to_row][to_col]
+        moved_piece = self.board_state.get_piece(from_row, from_col)
+        captured_piece = self.board_state.get_piece(to_row, to_col)
 
         # Only pawns promote when reaching the last row (based on color)
         is_promoted = False
         if abs(moved_piece) == 1:
             if ((is_white(moved_piece) and to_row == 0) or
-                    (is_black(moved_piece) and to_row == len(self.board_state.board) - 1)):
+                    (is_black(moved_piece) and to_row == BOARD_ROW - 1)):
                 is_promoted = True
 
         return MoveState(
@@ -1,51 +1,161 @@
 from src.main.utils.constants import *
 from .board_state import BoardState
-from .move_state import MoveState
-from ..utils.utils import is_opponent, is_own_piece, is_within_board
+from .move_state import *
+from ..utils.utils import is_opponent, is_own_piece
+
+
+# Mailbox index offsets
+UP = -MAILBOX_COL
+DOWN = MAILBOX_COL
+LEFT = -1
+RIGHT = 1
+
+# (row, col) directions of the sliding pieces
+DIAGONAL_DIRS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+STRAIGHT_DIRS = ((-1, 0), (1, 0), (0, -1), (0, 1))
 
 
 class MoveGenerator:
     def __init__(self):
         self.KNIGHT_MOVES_FROM = self.generate_pre_knight_moves(rows=BOARD_ROW, cols=BOARD_COL)
         self.KING_MOVES_FROM = self.generate_pre_king_moves(rows=BOARD_ROW, cols=BOARD_COL)
+        self.BISHOP_RAYS_FROM = self.generate_pre_ray_moves(DIAGONAL_DIRS, rows=BOARD_ROW, cols=BOARD_COL)
+        self.ROOK_RAYS_FROM = self.generate_pre_ray_moves(STRAIGHT_DIRS, rows=BOARD_ROW, cols=BOARD_COL)
+        self.QUEEN_RAYS_FROM = [
+            bishop_rays + rook_rays for bishop_rays, rook_rays in zip(self.BISHOP_RAYS_FROM, self.ROOK_RAYS_FROM)
+        ]
 
-    def generate_all_moves(self, board_state: BoardState):
-        rows, cols = len(board_state.board), len(board_state.board[0])
-
-        """List comprehension to gather all valid moves"""
+    def generate_all_moves(self, board_state: BoardState) -> list[int]:
+        """All pseudo-legal moves of the side to move, packed (see move_state)"""
+        # List comprehension to gather all valid moves, only the occupied squares are visited
         return [
             move
-            for row in range(rows)
-            for col in range(cols)
-            if is_own_piece(board_state.board[row][col], board_state.is_white_turn)
-            for move in self.generate_piece_moves(board_state, (row, col))
+            for index in board_state.own_pieces()
+            for move in self.generate_square_moves(board_state, index)
         ]
 
-    def generate_capture_moves(self, board_state: BoardState) -> list[MoveState]:
-        """Generate only capture moves for quiescence search"""
-        all_moves = self.generate_all_moves(board_state)
-        return [move for move in all_moves if move.captured_piece]
+    def generate_capture_moves(self, board_state: BoardState, include_promotions=False) -> list[int]:
+        """
+        Generate only capture moves for quiescence search, plus quiet queen promotions if include_promotions.
+        Same moves in the same order as filtering generate_all_moves, without generating the quiet moves:
+        rays stop at the first piece and step targets are only taken when an enemy piece is there.
+        """
+        squares = board_state.squares
+        moves = []
+
+        for index in board_state.own_pieces():
+            piece = squares[index]
+            base = index | (piece & MOVE_PIECE_MASK) << MOVE_PIECE_SHIFT
+
+            if piece == WHITE_PAWN or piece == BLACK_PAWN:
+                new_index = index + (UP if board_state.is_white_turn else DOWN)
+                new_pos = MAILBOX_POSITION[new_index]
+                if new_pos is None:
+                    continue
+                if (new_pos[0] == 0 and board_state.is_white_turn) or (new_pos[0] == BOARD_ROW - 1 and not board_state.is_white_turn):
+                    base |= MOVE_PROMOTION_FLAG
+                    if include_promotions and squares[new_index] == EMPTY:
+                        moves.append(base | new_index << MOVE_TO_SHIFT)
+                targets = (new_index + LEFT, new_index + RIGHT)
+
+            elif piece == WHITE_KNIGHT or piece == BLACK_KNIGHT:
+                targets = self.KNIGHT_MOVES_FROM[index]
+            elif piece == WHITE_KING or piece == BLACK_KING:
+                targets = self.KING_MOVES_FROM[index]
+
+            else:
+                if piece == WHITE_BISHOP or piece == BLACK_BISHOP:
+                    rays = self.BISHOP_RAYS_FROM[index]
+                elif piece == WHITE_ROOK or piece == BLACK_ROOK:
+                    rays = self.ROOK_RAYS_FROM[index]
+                else:
+                    rays = self.QUEEN_RAYS_FROM[index]
+
+                # Only the first piece on each ray can be captured
+                targets = []
+                for ray in rays:
+                    for target_index in ray:
+                        if squares[target_index] != EMPTY:
+                            targets.append(target_index)
+                            break
+
+            for target_index in targets:
+                target = squares[target_index]
+                if target != OFF_BOARD and is_opponent(piece, target):
+                    moves.append(base | target_index << MOVE_TO_SHIFT | (target & MOVE_PIECE_MASK) << MOVE_CAPTURED_SHIFT)
+
+        return moves
+
+
+    def generate_quiet_moves(self, board_state: BoardState) -> list[int]:
+        """Non-capture, non-promotion moves, the complement of generate_capture_moves(include_promotions=True)"""
+        squares = board_state.squares
+        moves = []
+
+        for index in board_state.own_pieces():
+            piece = squares[index]
+            base = index | (piece & MOVE_PIECE_MASK) << MOVE_PIECE_SHIFT
+
+            if piece == WHITE_PAWN or piece == BLACK_PAWN:
+                new_index = index + (UP if board_state.is_white_turn else DOWN)
+                new_pos = MAILBOX_POSITION[new_index]
+                if (new_pos is not None and squares[new_index] == EMPTY
+                        and not (new_pos[0] == 0 and board_state.is_white_turn)
+                        and not (new_pos[0] == BOARD_ROW - 1 and not board_state.is_white_turn)):
+                    moves.append(base | new_index << MOVE_TO_SHIFT)
+                continue
+
+            if piece == WHITE_KNIGHT or piece == BLACK_KNIGHT or piece == WHITE_KING or piece == BLACK_KING:
+                targets = self.KNIGHT_MOVES_FROM[index] if abs(piece) == WHITE_KNIGHT else self.KING_MOVES_FROM[index]
+                for target_index in targets:
+                    if squares[target_index] == EMPTY:
+                        moves.append(base | target_index << MOVE_TO_SHIFT)
+                continue
+
+            if piece == WHITE_BISHOP or piece == BLACK_BISHOP:
+                rays = self.BISHOP_RAYS_FROM[index]
+            elif piece == WHITE_ROOK or piece == BLACK_ROOK:
+                rays = self.ROOK_RAYS_FROM[index]
+            else:
+                rays = self.QUEEN_RAYS_FROM[index]
+
+            for ray in rays:
+                for target_index in ray:
+                    if squares[target_index] != EMPTY:
+                        break
+                    moves.append(base | target_index << MOVE_TO_SHIFT)
+
+        return moves
+
 
+    def is_pseudo_legal(self, board_state: BoardState, move: int) -> bool:
+        """Whether a stored move (e.g. a transposition table move) can be played in this position"""
+        return move in self.generate_square_moves(board_state, move & MOVE_SQUARE_MASK)
 
-    def generate_piece_moves(self, board_state: BoardState, pos):
 
-        piece = board_state.board[pos[0]][pos[1]]
+    def generate_piece_moves(self, board_state: BoardState, pos) -> list[int]:
+        return self.generate_square_moves(board_state, MAILBOX_INDEX[pos[0]][pos[1]])
+
+
+    def generate_square_moves(self, board_state: BoardState, index: int) -> list[int]:
+
+        piece = board_state.squares[index]
         if not is_own_piece(piece, board_state.is_white_turn):
             return []
 
 
         if piece == WHITE_PAWN or piece == BLACK_PAWN:
-            return self.get_pawn_moves(board_state, pos)
+            return self.get_pawn_moves(board_state, index)
         elif piece == WHITE_ROOK or piece == BLACK_ROOK:
-            return self.get_rook_moves(board_state, pos)
+            return self.get_rook_moves(board_state, index)
         elif piece == WHITE_KNIGHT or piece == BLACK_KNIGHT:
-            return self.get_knight_moves(board_state, pos)
+            return self.get_knight_moves(board_state, index)
         elif piece == WHITE_BISHOP or piece == BLACK_BISHOP:
-            return self.get_bishop_moves(board_state, pos)
+            return self.get_bishop_moves(board_state, index)
         elif piece == WHITE_QUEEN or piece == BLACK_QUEEN:
-            return self.get_queen_moves(board_state, pos)
+            return self.get_queen_moves(board_state, index)
         elif piece == WHITE_KING or piece == BLACK_KING:
-            return self.get_king_moves(board_state, pos)
+            return self.get_king_moves(board_state, index)
         elif piece == EMPTY:
             return []
         else:
@@ -54,110 +164,93 @@ class MoveGenerator:
 
     # default perspective is white
     # white pawn will move up(-1) and black moves down(+1)
-    def get_pawn_moves(self, board_state: BoardState, pos):
-        row, col = pos
-        piece = board_state.board[row][col]
+    def get_pawn_moves(self, board_state: BoardState, index: int):
+        squares = board_state.squares
+        piece = squares[index]
         turn = board_state.is_white_turn
         moves = []
 
         # Determine movement direction based on turn
-        direction = -1 if turn else 1
+        new_index = index + (UP if turn else DOWN)
+        new_pos = MAILBOX_POSITION[new_index]
+        if new_pos is None:
+            return moves
+        is_promoted = (new_pos[0] == 0 and turn) or (new_pos[0] == BOARD_ROW - 1 and not turn)
+
+        # from square, moved piece and promotion flag are shared by all pawn moves
+        base = index | (piece & MOVE_PIECE_MASK) << MOVE_PIECE_SHIFT
+        if is_promoted:
+            base |= MOVE_PROMOTION_FLAG
 
         # Forward move (if target square is empty)
-        new_row = row + direction
-        if 0 <= new_row < len(board_state.board):
-            if board_state.board[new_row][col] == EMPTY:
-                is_promoted = (new_row == 0 and turn) or (new_row == len(board_state.board) - 1 and not turn)
-                moves.append(MoveState((row, col), (new_row, col), piece, None, is_promoted))
+        if squares[new_index] == EMPTY:
+            moves.append(base | new_index << MOVE_TO_SHIFT)
 
         # Diagonal captures (must have opponent piece)
-        for dc in [-1, 1]:
-            new_col = col + dc
-            if is_within_board(new_row, new_col, board_state.board):
-                target = board_state.board[new_row][new_col]
-                if is_opponent(piece, target):
-                    is_promoted = (new_row == 0 and turn) or (new_row == len(board_state.board) - 1 and not turn)
-                    moves.append(MoveState((row, col), (new_row, new_col), piece, target, is_promoted))
+        for target_index in (new_index + LEFT, new_index + RIGHT):
+            target = squares[target_index]
+            if target != OFF_BOARD and is_opponent(piece, target):
+                moves.append(base | target_index << MOVE_TO_SHIFT | (target & MOVE_PIECE_MASK) << MOVE_CAPTURED_SHIFT)
 
         return moves
 
 
-    def get_knight_moves(self, board_state: BoardState, pos):
-        row, col = pos
-        piece = board_state.board[row][col]
-        moves = []
+    def get_knight_moves(self, board_state: BoardState, index: int):
+        return self.get_step_moves(board_state, index, self.KNIGHT_MOVES_FROM[index])
 
-        # Retrieve precomputed knight moves
-        for new_row, new_col in self.KNIGHT_MOVES_FROM.get((row, col), []):
-            target = board_state.board[new_row][new_col]
 
-            if target == EMPTY or is_opponent(piece, target):
-                move_state = MoveState((row, col), (new_row, new_col), piece, target if target != EMPTY else None)
-                moves.append(move_state)
-
-        return moves
+    def get_bishop_moves(self, board_state: BoardState, index: int):
+        return self.get_sliding_moves(board_state, index, self.BISHOP_RAYS_FROM[index])
 
 
+    def get_rook_moves(self, board_state: BoardState, index: int):
+        return self.get_sliding_moves(board_state, index, self.ROOK_RAYS_FROM[index])
 
-    def get_bishop_moves(self, board_state: BoardState, pos):
-        diagonal_dirs = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-        return self.get_sliding_moves(board_state, pos, diagonal_dirs)
 
+    def get_queen_moves(self, board_state: BoardState, index: int):
+        return self.get_sliding_moves(board_state, index, self.QUEEN_RAYS_FROM[index])
 
-    def get_rook_moves(self, board_state: BoardState, pos):
-        straight_dirs = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-        return self.get_sliding_moves(board_state, pos, straight_dirs)
 
+    def get_king_moves(self, board_state: BoardState, index: int):
+        return self.get_step_moves(board_state, index, self.KING_MOVES_FROM[index])
 
-    def get_queen_moves(self, board_state: BoardState, pos):
-        straight_and_diagonal_dirs = [(-1, -1), (-1, 1), (1, -1), (1, 1),(-1, 0), (1, 0), (0, -1), (0, 1)]
-        return self.get_sliding_moves(board_state, pos, straight_and_diagonal_dirs)
 
 
-
-    def get_sliding_moves(self, board_state: BoardState, pos, directions):
-        row, col = pos
-        piece = board_state.board[row][col]
+    def get_sliding_moves(self, board_state: BoardState, index: int, rays):
+        squares = board_state.squares
+        piece = squares[index]
+        base = index | (piece & MOVE_PIECE_MASK) << MOVE_PIECE_SHIFT
         moves = []
 
-        for dr, dc in directions:
-            new_row, new_col = row, col
-            while True:
-                new_row += dr
-                new_col += dc
-
-                if not is_within_board(new_row, new_col, board_state.board):
-                    break
-
-                target = board_state.board[new_row][new_col]
+        # Rays are precomputed and stay on the board, only occupancy is checked
+        for ray in rays:
+            for target_index in ray:
+                target = squares[target_index]
 
                 if target == EMPTY:
-                    move_state = MoveState((row, col), (new_row, new_col), piece, None)
-                    moves.append(move_state)
-                elif is_opponent(piece, target):
-                    move_state = MoveState((row, col), (new_row, new_col), piece, target)
-                    moves.append(move_state)
-                    break
+                    moves.append(base | target_index << MOVE_TO_SHIFT)
                 else:
+                    if is_opponent(piece, target):
+                        moves.append(base | target_index << MOVE_TO_SHIFT | (target & MOVE_PIECE_MASK) << MOVE_CAPTURED_SHIFT)
                     break
 
         return moves
 
 
-
-
-    def get_king_moves(self, board_state: BoardState, pos):
-        row, col = pos
-        piece = board_state.board[row][col]
+    def get_step_moves(self, board_state: BoardState, index: int, targets):
+        """Knight and king moves from their precomputed target squares"""
+        squares = board_state.squares
+        piece = squares[index]
+        base = index | (piece & MOVE_PIECE_MASK) << MOVE_PIECE_SHIFT
         moves = []
 
-        # Retrieve precomputed king moves
-        for new_row, new_col in self.KING_MOVES_FROM.get((row, col), []):
-            target = board_state.board[new_row][new_col]
+        for target_index in targets:
+            target = squares[target_index]
 
-            if target == EMPTY or is_opponent(piece, target):
-                move_state = MoveState((row, col), (new_row, new_col), piece, target if target != EMPTY else None)
-                moves.append(move_state)
+            if target == EMPTY:
+                moves.append(base | target_index << MOVE_TO_SHIFT)
+            elif is_opponent(piece, target):
+                moves.append(base | target_index << MOVE_TO_SHIFT | (target & MOVE_PIECE_MASK) << MOVE_CAPTURED_SHIFT)
 
         return moves
 
@@ -166,7 +259,7 @@ class MoveGenerator:
 
     # Move optimization functions
     def generate_pre_knight_moves(self, rows=6, cols=5):
-        """Generate a dictionary of precomputed knight moves for each board square."""
+        """Generate a list of precomputed knight moves for each board square, indexed by mailbox index."""
         knight_deltas = [
             (-2, -1), (-2, +1),
             (-1, -2), (-1, +2),
@@ -174,7 +267,7 @@ class MoveGenerator:
             (+2, -1), (+2, +1)
         ]
 
-        moves_from = {}
+        moves_from = [[] for _ in range(MAILBOX_SIZE)]
 
         for r in range(rows):
             for c in range(cols):
@@ -182,14 +275,14 @@ class MoveGenerator:
                 for dr, dc in knight_deltas:
                     nr, nc = r + dr, c + dc
                     if 0 <= nr < rows and 0 <= nc < cols:
-                        moves.append((nr, nc))
-                moves_from[(r, c)] = moves
+                        moves.append(MAILBOX_INDEX[nr][nc])
+                moves_from[MAILBOX_INDEX[r][c]] = moves
 
         return moves_from
 
 
     def generate_pre_king_moves(self, rows=6, cols=5):
-        moves_from = {}
+        moves_from = [[] for _ in range(MAILBOX_SIZE)]
         for r in range(rows):
             for c in range(cols):
                 moves = []
@@ -199,7 +292,26 @@ class MoveGenerator:
                             continue
                         nr, nc = r + dr, c + dc
                         if 0 <= nr < rows and 0 <= nc < cols:
-                            moves.append((nr, nc))
-                moves_from[(r, c)] = moves
+                            moves.append(MAILBOX_INDEX[nr][nc])
+                moves_from[MAILBOX_INDEX[r][c]] = moves
         return moves_from
 
+
+    def generate_pre_ray_moves(self, directions, rows=6, cols=5):
+        """
+        For each board square (by mailbox index), one ray per direction:
+        the target squares in order of distance, up to the board edge.
+        """
+        rays_from = [() for _ in range(MAILBOX_SIZE)]
+        for r in range(rows):
+            for c in range(cols):
+                rays = []
+                for dr, dc in directions:
+                    ray = []
+                    nr, nc = r + dr, c + dc
+                    while 0 <= nr < rows and 0 <= nc < cols:
+                        ray.append(MAILBOX_INDEX[nr][nc])
+                        nr, nc = nr + dr, nc + dc
+                    rays.append(tuple(ray))
+                rays_from[MAILBOX_INDEX[r][c]] = tuple(rays)
+        return rays_from
@@ -1,7 +1,60 @@
+from src.main.utils.constants import EMPTY, MAILBOX_INDEX, MAILBOX_POSITION
 
 
+# Packed move layout (one int per move, used by the move generator, BoardState and the engine):
+#   bits  0-6   from square (mailbox index)
+#   bits  7-13  to square (mailbox index)
+#   bits 14-17  moved piece (4 bit two's complement)
+#   bits 18-21  captured piece (4 bit two's complement, 0 = no capture)
+#   bit  22     promotion flag
+MOVE_SQUARE_MASK = 0x7F
+MOVE_TO_SHIFT = 7
+MOVE_PIECE_SHIFT = 14
+MOVE_CAPTURED_SHIFT = 18
+MOVE_PIECE_MASK = 0xF
+MOVE_CAPTURED_MASK = MOVE_PIECE_MASK << MOVE_CAPTURED_SHIFT
+MOVE_PROMOTION_FLAG = 1 << 22
+# Passing the turn (null move pruning), never a real move as square 0 is off the board
+NULL_MOVE = 0
 
+# 4 bit two's complement -> piece
+PACKED_PIECE = tuple(bits - 16 if bits > 7 else bits for bits in range(16))
+
+
+def encode_move(from_index: int, to_index: int, moved_piece: int, captured_piece: int = EMPTY, is_promoted: bool = False) -> int:
+    move = (from_index
+            | to_index << MOVE_TO_SHIFT
+            | (moved_piece & MOVE_PIECE_MASK) << MOVE_PIECE_SHIFT
+            | (captured_piece & MOVE_PIECE_MASK) << MOVE_CAPTURED_SHIFT)
+    if is_promoted:
+        move |= MOVE_PROMOTION_FLAG
+    return move
+
+def move_from_index(move: int) -> int:
+    return move & MOVE_SQUARE_MASK
+
+def move_to_index(move: int) -> int:
+    return (move >> MOVE_TO_SHIFT) & MOVE_SQUARE_MASK
+
+def move_moved_piece(move: int) -> int:
+    return PACKED_PIECE[(move >> MOVE_PIECE_SHIFT) & MOVE_PIECE_MASK]
+
+def move_captured_piece(move: int) -> int:
+    """Captured piece, EMPTY if the move is not a capture"""
+    return PACKED_PIECE[(move >> MOVE_CAPTURED_SHIFT) & MOVE_PIECE_MASK]
+
+def move_is_capture(move: int) -> bool:
+    return move & MOVE_CAPTURED_MASK != 0
+
+def move_is_promoted(move: int) -> bool:
+    return move & MOVE_PROMOTION_FLAG != 0
+
+
+
+# Readable move, only built at the ChessGame/UI boundary
 class MoveState:
+    __slots__ = ('pre_pos', 'new_pos', 'moved_piece', 'captured_piece', 'is_promoted')
+
     def __init__(self, pre_pos, new_pos, moved_piece, captured_piece=None, is_promoted=False):
         self.pre_pos = pre_pos
         self.new_pos = new_pos
@@ -9,6 +62,25 @@ class MoveState:
         self.captured_piece = captured_piece
         self.is_promoted = is_promoted
 
+    @classmethod
+    def from_packed(cls, move: int) -> 'MoveState':
+        return cls(
+            MAILBOX_POSITION[move_from_index(move)],
+            MAILBOX_POSITION[move_to_index(move)],
+            move_moved_piece(move),
+            move_captured_piece(move) or None,
+            move_is_promoted(move)
+        )
+
+    def to_packed(self) -> int:
+        return encode_move(
+            MAILBOX_INDEX[self.pre_pos[0]][self.pre_pos[1]],
+            MAILBOX_INDEX[self.new_pos[0]][self.new_pos[1]],
+            self.moved_piece,
+            self.captured_piece or EMPTY,
+            self.is_promoted
+        )
+
     def __eq__(self, other):
         if not isinstance(other, MoveState):
             return False
@@ -0,0 +1,154 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src.main.utils.constants import *
+from .board_state import BoardState
+from .move_generator import MoveGenerator
+from .move_state import *
+
+
+# Perft: count the leaf nodes of the move tree to a fixed depth.
+# King capture ends the game in this variant, so a position after a king capture is a leaf
+# and is not expanded further (the same as is_check_mate in the search).
+
+FEN_PIECES = {
+    'P': WHITE_PAWN, 'R': WHITE_ROOK, 'N': WHITE_KNIGHT, 'B': WHITE_BISHOP, 'Q': WHITE_QUEEN, 'K': WHITE_KING,
+    'p': BLACK_PAWN, 'r': BLACK_ROOK, 'n': BLACK_KNIGHT, 'b': BLACK_BISHOP, 'q': BLACK_QUEEN, 'k': BLACK_KING,
+}
+START_FEN = "rnbqk/ppppp/5/5/PPPPP/RNBQK w"
+
+
+def board_from_fen(fen: str, board_class=BoardState) -> BoardState:
+    """FEN-like position: rows from black's side separated by '/', digits for empty squares, then 'w' or 'b'."""
+    rows, turn = fen.split()
+    board = []
+    for fen_row in rows.split('/'):
+        row = []
+        for char in fen_row:
+            if char.isdigit():
+                row.extend([EMPTY] * int(char))
+            else:
+                row.append(FEN_PIECES[char])
+        board.append(row)
+
+    if len(board) != BOARD_ROW or any(len(row) != BOARD_COL for row in board):
+        raise ValueError(f"Invalid position: {fen}")
+
+    board_state = board_class(turn == 'w')
+    board_state.board = board
+    return board_state
+
+
+def board_to_fen(board_state: BoardState) -> str:
+    symbols = {piece: char for char, piece in FEN_PIECES.items()}
+    rows = []
+    for row in board_state.board:
+        fen_row = ""
+        empty = 0
+        for piece in row:
+            if piece == EMPTY:
+                empty += 1
+                continue
+            if empty:
+                fen_row += str(empty)
+                empty = 0
+            fen_row += symbols[piece]
+        rows.append(fen_row + (str(empty) if empty else ""))
+    return f"{'/'.join(rows)} {'w' if board_state.is_white_turn else 'b'}"
+
+
+def format_move(move: int) -> str:
+    """Coordinate notation, files a-e from white's left and ranks 1-6 from white's side, e.g. b2b3"""
+    text = ""
+    for index in (move_from_index(move), move_to_index(move)):
+        row, col = MAILBOX_POSITION[index]
+        text += f"{'abcde'[col]}{BOARD_ROW - row}"
+    if move_is_promoted(move):
+        text += "q"
+    return text
+
+
+def perft(board_state: BoardState, depth: int, move_generator: MoveGenerator = None, cache: dict = None) -> int:
+    """
+    Number of leaf nodes at depth plies from board_state.
+    cache is an optional dict keyed by (hash(board_state), depth) for transpositions.
+    """
+    if depth == 0 or board_state.is_check_mate():
+        return 1
+
+    move_generator = move_generator or MoveGenerator()
+    if cache is not None:
+        key = (hash(board_state), depth)
+        nodes = cache.get(key)
+        if nodes is not None:
+            return nodes
+
+    moves = move_generator.generate_all_moves(board_state)
+    if depth == 1:
+        nodes = sum(1 for _ in moves)
+    else:
+        nodes = 0
+        for move in moves:
+            board_state.make_move(move)
+            nodes += perft(board_state, depth - 1, move_generator, cache)
+            board_state.undo_move()
+
+    if cache is not None:
+        cache[key] = nodes
+    return nodes
+
+
+def _perft_root_move(board_state: BoardState, move: int, depth: int, use_cache: bool) -> int:
+    """Worker for divide(jobs > 1), runs in a separate process on its own copy of the board"""
+    board_state.make_move(move)
+    return perft(board_state, depth - 1, cache={} if use_cache else None)
+
+
+def divide(board_state: BoardState, depth: int, use_cache=False, jobs=1) -> dict[int, int]:
+    """Perft split by root move: packed root move -> leaf nodes below it. jobs > 1 splits root moves over processes."""
+    move_generator = MoveGenerator()
+    moves = move_generator.generate_all_moves(board_state)
+
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(_perft_root_move, board_state.copy(), move, depth, use_cache) for move in moves]
+            return {move: future.result() for move, future in zip(moves, futures)}
+
+    cache = {} if use_cache else None
+    results = {}
+    for move in moves:
+        board_state.make_move(move)
+        results[move] = perft(board_state, depth - 1, move_generator, cache)
+        board_state.undo_move()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft for MiniChess")
+    parser.add_argument("depth", type=int, help="search depth in plies")
+    parser.add_argument("--fen", default=START_FEN, help=f"position, default: '{START_FEN}'")
+    parser.add_argument("--divide", action="store_true", help="print the node count below every root move")
+    parser.add_argument("--hash", action="store_true", help="cache subtree counts by Zobrist key")
+    parser.add_argument("--jobs", type=int, default=1, help="split root moves across N worker processes")
+    args = parser.parse_args()
+
+    board_state = board_from_fen(args.fen)
+    start = time.time()
+    if args.divide or args.jobs > 1:
+        results = divide(board_state, args.depth, use_cache=args.hash, jobs=args.jobs)
+        if args.divide:
+            for move, nodes in results.items():
+                print(f"{format_move(move)}: {nodes}")
+        nodes = sum(results.values())
+    else:
+        nodes = perft(board_state, args.depth, cache={} if args.hash else None)
+    duration = time.time() - start
+
+    print(f"Nodes: {nodes}")
+    print(f"Time taken: {duration:.4f} seconds")
+    print(f"Nodes per second: {nodes / duration:.2f}")
+
+
+if __name__ == "__main__":
+    main()
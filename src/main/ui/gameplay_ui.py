@@ -215,7 +215,7 @@ class GamePlayUI:
             if self.chess_game.apply_move((row, col)):
                 print('Move applied')
                 # print(self.chess_game.board_state.print_board())
-                self.chess_board_ui.apply_move(row, col, self.chess_game.board_state.board[row][col])
+                self.chess_board_ui.apply_move(row, col, self.chess_game.board_state.get_piece(row, col))
                 self.ply_count += 1
                 if self.chess_game.is_game_over():
                     turn = self.chess_game.get_turn()
@@ -235,7 +235,7 @@ class GamePlayUI:
 
         move = self.chess_game.play_ai_move()
         self.chess_board_ui.clear_piece(move.pre_pos[0], move.pre_pos[1])
-        self.chess_board_ui.draw_piece(move.new_pos[0], move.new_pos[1], self.chess_game.board_state.board[move.new_pos[0]][move.new_pos[1]])
+        self.chess_board_ui.draw_piece(move.new_pos[0], move.new_pos[1], self.chess_game.board_state.get_piece(move.new_pos[0], move.new_pos[1]))
 
         self.ply_count += 1
         # print(self.chess_game.board_state.print_board())
@@ -68,6 +68,26 @@ BOARD_COL = len(WHITE_PLAYER_PERSPECTIVE[0])
 BLACK_PLAYER_PERSPECTIVE = [[row[::-1] for row in WHITE_PLAYER_PERSPECTIVE[::-1]]]
 
 
+# Flat mailbox layout: two padding columns per row (one left, one right, adjacent rows share them
+# as a two square gap) and two padding rows above and below,
+# so any king, knight or sliding step off the board lands on an OFF_BOARD sentinel
+OFF_BOARD = 7
+MAILBOX_COL = BOARD_COL + 2
+MAILBOX_ROW = BOARD_ROW + 4
+MAILBOX_SIZE = MAILBOX_COL * MAILBOX_ROW
+
+# (row, col) -> mailbox index
+MAILBOX_INDEX = [[(row + 2) * MAILBOX_COL + col + 1 for col in range(BOARD_COL)] for row in range(BOARD_ROW)]
+# mailbox index -> (row, col), None for sentinel squares
+MAILBOX_POSITION = [None] * MAILBOX_SIZE
+for _row in range(BOARD_ROW):
+    for _col in range(BOARD_COL):
+        MAILBOX_POSITION[MAILBOX_INDEX[_row][_col]] = (_row, _col)
+
+# playable squares in row-major order
+BOARD_SQUARES = [index for row in MAILBOX_INDEX for index in row]
+
+
 
 random.seed(1234)
 # Initialize Zobrist table (13 piece types including empty, 6 rows, 5 columns)
@@ -78,3 +98,10 @@ ZOBRIST_PIECE_SQUARE = [
 
 ZOBRIST_TURN = random.getrandbits(64)
 random.seed()
+
+# Same keys as ZOBRIST_PIECE_SQUARE, indexed by [piece + 6][mailbox index]
+ZOBRIST_PIECE_INDEX = [[0] * MAILBOX_SIZE for _ in range(13)]
+for _piece in range(13):
+    for _row in range(BOARD_ROW):
+        for _col in range(BOARD_COL):
+            ZOBRIST_PIECE_INDEX[_piece][MAILBOX_INDEX[_row][_col]] = ZOBRIST_PIECE_SQUARE[_piece][_row][_col]
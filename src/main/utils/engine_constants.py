@@ -77,3 +77,20 @@ POSITION_BONUS = {
 }
 
 TRADE_BONUS = 10
+
+
+# Signed lookup tables indexed by [piece + 6] (and mailbox index), built once at import.
+# White pieces count positive and black pieces negative, so summing over the board gives white minus black.
+# PIECE_SQUARE_VALUE has the piece value and its position bonus pre-added, and the bonus pre-mirrored for black,
+# so every piece is one table read. PIECE_MATERIAL alone is kept for the material terms (TRADE_BONUS).
+PIECE_MATERIAL = [0] * 13
+PIECE_SQUARE_VALUE = [[0] * MAILBOX_SIZE for _ in range(13)]
+for _piece_type, _bonus in POSITION_BONUS.items():
+    _value = PIECE_VALUES[_piece_type]
+    PIECE_MATERIAL[_piece_type + 6] = _value
+    PIECE_MATERIAL[-_piece_type + 6] = -_value
+    for _row in range(BOARD_ROW):
+        for _col in range(BOARD_COL):
+            # black reads the table upside down
+            PIECE_SQUARE_VALUE[_piece_type + 6][MAILBOX_INDEX[_row][_col]] = _value + _bonus[_row][_col]
+            PIECE_SQUARE_VALUE[-_piece_type + 6][MAILBOX_INDEX[_row][_col]] = -(_value + _bonus[BOARD_ROW - 1 - _row][_col])
@@ -1,8 +1,15 @@
+import contextlib
+import io
+import os
+import random
+import resource
 import time
 from src.main.utils.constants import *
 from src.main.engine.engine import Engine
 from src.main.gameplay.board_state import BoardState
 from src.main.gameplay.chess_game import ChessGame
+from src.main.gameplay.move_generator import MoveGenerator
+from src.main.gameplay.move_state import MoveState
 
 
 TEST_BOARD = [
@@ -14,10 +21,11 @@ TEST_BOARD = [
     [EMPTY, EMPTY, EMPTY, WHITE_KING, EMPTY],
 ]
 
-def benchmark_engine_vs_engine(max_moves=50, depth=4, e1_quiescence=False, e2_quiescence=False):
-    # Create two engines with different colors
-    engine_white = Engine(depth, engine_white_turn=True, use_quiescence=e1_quiescence)
-    engine_black = Engine(depth, engine_white_turn=False, use_quiescence=e2_quiescence)
+def benchmark_engine_vs_engine(max_moves=50, depth=4, e1_quiescence=False, e2_quiescence=False, time_limit=None,
+                               **engine_options):
+    # Create two engines with different colors, engine_options go to both (e.g. use_null_move=True)
+    engine_white = Engine(depth, engine_white_turn=True, use_quiescence=e1_quiescence, **engine_options)
+    engine_black = Engine(depth, engine_white_turn=False, use_quiescence=e2_quiescence, **engine_options)
     
     # Initialize game
     chess_game = ChessGame(engine=None)
@@ -25,6 +33,9 @@ def benchmark_engine_vs_engine(max_moves=50, depth=4, e1_quiescence=False, e2_qu
     move_count = 0
     total_node_visited = 0
     total_q_node_visited = 0
+    total_eval_cache_probes = 0
+    total_eval_cache_hits = 0
+    total_hash_move_cutoffs = 0
     
     print("Starting engine vs engine game...")
     print(chess_game.board_state.print_board())
@@ -34,18 +45,21 @@ def benchmark_engine_vs_engine(max_moves=50, depth=4, e1_quiescence=False, e2_qu
     while move_count < max_moves:
         # White's turn
         if chess_game.get_turn():
-            move = engine_white.play_move(chess_game.board_state.copy())
+            move = engine_white.play_move(chess_game.board_state.copy(), time_limit)
         # Black's turn
         else:
-            move = engine_black.play_move(chess_game.board_state.copy())
+            move = engine_black.play_move(chess_game.board_state.copy(), time_limit)
             
         # Make the move
         chess_game.board_state.make_move(move)
         move_count += 1
         total_node_visited += engine_white.stats.nodes_visited + engine_black.stats.nodes_visited
         total_q_node_visited += engine_white.stats.q_nodes_visited + engine_black.stats.q_nodes_visited
+        total_eval_cache_probes += engine_white.stats.eval_cache_probes + engine_black.stats.eval_cache_probes
+        total_eval_cache_hits += engine_white.stats.eval_cache_hits + engine_black.stats.eval_cache_hits
+        total_hash_move_cutoffs += engine_white.stats.cutoffs['TT'] + engine_black.stats.cutoffs['TT']
 
-        print(f"\nMove {move_count}: {move}")
+        print(f"\nMove {move_count}: {MoveState.from_packed(move)}")
         print(chess_game.board_state.print_board())
         
         # Check for checkmate
@@ -53,6 +67,9 @@ def benchmark_engine_vs_engine(max_moves=50, depth=4, e1_quiescence=False, e2_qu
             winner = "Black" if chess_game.get_turn() else "White"
             print(f"\nCheckmate! {winner} wins in {move_count} moves!")
             break
+        if chess_game.board_state.is_repetition(2):
+            print(f"\nDraw by threefold repetition in {move_count} moves!")
+            break
     
     end_time = time.time()
     total_time = end_time - start_time
@@ -63,11 +80,91 @@ def benchmark_engine_vs_engine(max_moves=50, depth=4, e1_quiescence=False, e2_qu
     print(f"Average time per move: {total_time/move_count:.6f} seconds")
     print(f"Nodes Visited: {total_node_visited} + {total_q_node_visited} = {total_node_visited + total_q_node_visited}")
     print(f"Average nodes visited per move: {(total_node_visited + total_q_node_visited) / move_count:.2f}")
+    if total_eval_cache_probes:
+        print(f"Eval cache hit rate: {total_eval_cache_hits / total_eval_cache_probes:.1%}")
+    print(f"Hash move cutoffs: {total_hash_move_cutoffs / (total_node_visited + total_q_node_visited):.1%} of nodes")
     print("\nWhite engine last move stats:")
     print(engine_white.stats)
     print("\nBlack engine last move stats:")
     print(engine_black.stats)
 
+def opening_positions(positions=6) -> list[BoardState]:
+    """The first positions of a depth 3 engine game"""
+    board_states = [BoardState(True)]
+    engine = Engine(3, engine_white_turn=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        while len(board_states) < positions:
+            board_state = board_states[-1].copy()
+            engine.engine_white_turn = board_state.is_white_turn
+            board_state.make_move(engine.play_move(board_state.copy()))
+            board_states.append(board_state)
+    return board_states
+
+
+def time_positions(board_states: list[BoardState], depth: int, **engine_options) -> float:
+    """Seconds for a pair of engines with engine_options to search board_states at a fixed depth"""
+    engines = {white: Engine(depth, engine_white_turn=white, **engine_options) for white in (True, False)}
+    start_time = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for board_state in board_states:
+            engines[board_state.is_white_turn].play_move(board_state.copy())
+    total_time = time.time() - start_time
+    for engine in engines.values():
+        engine.close()
+    return total_time
+
+
+def benchmark_parallel_root(depth=6, max_workers=None, positions=6):
+    """Time to search the first positions of a game at a fixed depth, with 1, 2, 4, ... max_workers root split workers"""
+    max_workers = max_workers or os.cpu_count()
+    board_states = opening_positions(positions)
+
+    worker_counts = sorted({1 << power for power in range(max_workers.bit_length()) if 1 << power <= max_workers} | {max_workers})
+    single_time = None
+    for workers in worker_counts:
+        total_time = time_positions(board_states, depth, workers=workers)
+        single_time = single_time or total_time
+        print(f"workers = {workers}: {total_time:.3f} seconds, speedup {single_time / total_time:.2f}")
+
+
+def benchmark_lazy_smp(depth=7, process_counts=(1, 2, 4, 8), positions=6):
+    """Time to depth of lazy SMP (main search plus process_count - 1 helpers) on the first positions of a game"""
+    board_states = opening_positions(positions)
+
+    single_time = None
+    for processes in process_counts:
+        total_time = time_positions(board_states, depth, helpers=processes - 1)
+        single_time = single_time or total_time
+        print(f"processes = {processes}: {total_time:.3f} seconds to depth {depth}, speedup {single_time / total_time:.2f}")
+
+
+def benchmark_session_memory(games=500, depth=2, max_plies=60, report_every=50):
+    """Peak memory of one pair of engines playing games back to back (random openings, like engine_match)"""
+    move_generator = MoveGenerator()
+    engines = {white: Engine(depth, engine_white_turn=white) for white in (True, False)}
+    start_time = time.time()
+
+    for game in range(1, games + 1):
+        rng = random.Random(game)
+        board_state = BoardState(True)
+        for _ in range(2):
+            board_state.make_move(rng.choice(move_generator.generate_all_moves(board_state)))
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(max_plies):
+                move = engines[board_state.is_white_turn].play_move(board_state.copy())
+                if move is None:
+                    break
+                board_state.make_move(move)
+                if board_state.is_check_mate() or board_state.is_repetition(2):
+                    break
+
+        if game % report_every == 0:
+            # ru_maxrss is in kilobytes on Linux
+            peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f"games = {game}: peak memory {peak_mb:.1f} MB, "
+                  f"{len(engines[True].transposition_table)} table entries, {time.time() - start_time:.1f} seconds")
+
+
 if __name__ == "__main__":
     benchmark_engine_vs_engine(max_moves=20, depth=5, e1_quiescence=True, e2_quiescence=True)
 
@@ -151,4 +248,78 @@ if __name__ == "__main__":
 # Black engine last move stats:
 # Nodes Visited: 5282
 # Q Nodes Visited: 0
-# Evaluation: -460.00
\ No newline at end of file
+# Evaluation: -460.00
+
+# depth = 5 (quiescence), staged move picker, before / after SEE pruning of losing captures in quiescence
+# Nodes Visited: 356334 + 628057 = 984391
+# Nodes Visited: 364888 + 432195 = 797083
+
+# + delta pruning (margin 200) in quiescence, futility / reverse futility pruning at depth 1-2 (margins 200, 500)
+# Total time: 3.459154 seconds
+# Nodes Visited: 234351 + 202093 = 436444
+
+# + iterative deepening (fixed depth 5, no time limit), quiescence TT entries kept out of main search probes
+# (the numbers above reused quiescence scores as full-width results at depth <= 3)
+# Total time: 5.192868 seconds
+# Nodes Visited: 355774 + 301529 = 657303
+
+# negamax + principal variation search
+# Total time: 2.616003 seconds
+# Nodes Visited: 130789 + 146650 = 277439
+
+# + aspiration windows (50, doubled on fail high / fail low) from depth 2
+# Total time: 2.394052 seconds
+# Nodes Visited: 124785 + 140286 = 265071
+
+# + killer moves (2 per ply) and history heuristic for the quiet moves
+# Total time: 1.978554 seconds
+# Nodes Visited: 105129 + 109229 = 214358
+
+# + hash move first at the root too, hash move cutoffs reported
+# Nodes Visited: 104974 + 109410 = 214384
+# Hash move cutoffs: 4.4% of nodes
+
+# + null move pruning (R = 2), benchmark_engine_vs_engine(..., use_null_move=...)
+# depth = 5, null move: 1.655005 seconds, Nodes Visited: 84132 + 94182 = 178314
+# depth = 5, without:   1.960788 seconds, Nodes Visited: 104974 + 109410 = 214384
+# depth = 6, null move: 5.199405 seconds, Nodes Visited: 225445 + 252695 = 478140
+# depth = 6, without:   5.818132 seconds, Nodes Visited: 311577 + 287950 = 599527
+
+# + late move reductions, benchmark_engine_vs_engine(..., late_move_reductions=...)
+# (the engines play different games with different settings, so the totals only compare roughly)
+# depth = 5, ((3, 1), (8, 2)): 0.795846 seconds, Nodes Visited: 40393 + 44911 = 85304
+# depth = 5, None:             1.285036 seconds, Nodes Visited: 84132 + 94182 = 178314
+# depth = 6, ((3, 1), (8, 2)): 1.131376 seconds, Nodes Visited: 47724 + 53679 = 101403
+# depth = 6, ((3, 1),):        0.968967 seconds, Nodes Visited: 51154 + 57256 = 108410
+# depth = 6, None:             5.041236 seconds, Nodes Visited: 225445 + 252695 = 478140
+
+# + repetition detection, max_moves=200 at depth = 4 now ends "Draw by threefold repetition in 90 moves!"
+
+# root split over worker processes, benchmark_parallel_root(depth=6, max_workers=4)
+# measured on a single core machine, so this is only the overhead (process start, pickling, a cold
+# transposition table per worker), the curve has to be taken on a multi-core server
+# workers = 1: 0.943 seconds, speedup 1.00
+# workers = 2: 1.771 seconds, speedup 0.53
+# workers = 4: 2.037 seconds, speedup 0.46
+# the root split searched every iteration with the full window while workers = 1 used aspiration windows,
+# now both do (same settings, later tables). Still not quite like for like: a worker reads alpha when its
+# root move starts, so it misses improvements other workers find meanwhile and searches more nodes
+# workers = 1: 0.464 seconds, speedup 1.00
+# workers = 2: 0.862 seconds, speedup 0.54
+# workers = 4: 1.067 seconds, speedup 0.43
+
+# lazy SMP, benchmark_lazy_smp(depth=7, process_counts=(1, 2, 4, 8)), single core machine again,
+# the helpers only take time from the main search here
+# processes = 1: 1.952 seconds to depth 7, speedup 1.00
+# processes = 2: 2.680 seconds to depth 7, speedup 0.73
+# processes = 4: 3.803 seconds to depth 7, speedup 0.51
+# processes = 8: 4.550 seconds to depth 7, speedup 0.43
+
+# fixed-size array transposition table (16 MB, buckets of 4, generation aging) instead of the trimmed dict
+# benchmark_session_memory(games=500, depth=3), dict table before / array table after
+# games = 50:  peak memory 54.2 MB / 43.6 MB
+# games = 250: peak memory 72.4 MB / 43.6 MB
+# games = 500: peak memory 72.5 MB / 43.6 MB
+# 20 move game at depth 5: Total time: 0.944723 seconds (dict 0.860794), Nodes Visited: 40381 + 44885 = 85266
+# buckets by key % buckets (the whole 16 MB, 883008 entries) and probe / store without bucket slices
+# Total time: 0.668891 seconds, Nodes Visited: 40381 + 44885 = 85266
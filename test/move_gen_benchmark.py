@@ -1,12 +1,14 @@
 import time
 
 from src.main.engine.evaluation import evaluate_board
+from src.main.gameplay.bitboard_move_generator import BitboardMoveGenerator
+from src.main.gameplay.bitboard_state import BitboardState
 from src.main.gameplay.board_state import BoardState
 from src.main.gameplay.move_generator import MoveGenerator
 
-def benchmark_move_generation(runs=100000):
-    board_state = BoardState(True)
-    move_generator = MoveGenerator()
+def benchmark_move_generation(runs=100000, board_state=None, move_generator=None, evaluate=True):
+    board_state = board_state or BoardState(True)
+    move_generator = move_generator or MoveGenerator()
 
 
     start = time.time()
@@ -16,12 +18,13 @@ def benchmark_move_generation(runs=100000):
     for _ in range(runs):
         moves = move_generator.generate_all_moves(board_state)
         total_moves += len(moves)
-        total_eval += evaluate_board(board_state, True)
+        if evaluate:
+            total_eval += evaluate_board(board_state, True)
 
     end = time.time()
     duration = end - start
 
-    print(f"Benchmark: {runs} runs")
+    print(f"Benchmark: {runs} runs ({type(move_generator).__name__}{', with evaluation' if evaluate else ''})")
     print(f"Total moves generated: {total_moves}")
     print(f"Time taken: {duration:.4f} seconds")
     print(f"Moves per second: {total_moves / duration:.2f}")
@@ -29,7 +32,22 @@ def benchmark_move_generation(runs=100000):
 
 if __name__ == "__main__":
     benchmark_move_generation()
+    print()
+    # move generation only, mailbox vs bitboard backend
+    benchmark_move_generation(evaluate=False)
+    print()
+    benchmark_move_generation(board_state=BitboardState(True), move_generator=BitboardMoveGenerator(), evaluate=False)
 
 
 # Time taken: 3.3296 seconds
-# Moves per second: 210237.23
\ No newline at end of file
+# Moves per second: 210237.23
+
+# flat sentinel-padded mailbox board (re-measured against the list-of-lists board on the same machine)
+# list of lists: Moves per second: 119147.73
+# mailbox:       Moves per second: 243776.63
+
+
+# move generation only (no evaluation), start position
+# list of lists (baseline): Moves per second:  ~370000
+# mailbox:                  Moves per second:  ~400000 - 570000
+# bitboard:                 Moves per second: ~1280000 - 1460000
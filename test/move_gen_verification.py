@@ -0,0 +1,211 @@
+import random
+
+from src.main.engine.evaluation import evaluate_board, evaluate_board_full
+from src.main.engine.see import StaticExchange
+from src.main.gameplay.bitboard_move_generator import BitboardMoveGenerator
+from src.main.gameplay.bitboard_state import BitboardState
+from src.main.gameplay.board_state import BoardState
+from src.main.gameplay.move_generator import MoveGenerator
+from src.main.gameplay.move_state import *
+from src.main.gameplay.perft import START_FEN, board_from_fen, board_to_fen, divide, format_move, perft
+
+
+# Perft node counts by depth (1, 2, ...), cross-checked against the original list-of-lists generator
+PERFT_REFERENCE = {
+    START_FEN: [7, 49, 452, 4214, 46834, 527196],
+    "r1bqk/pp1pp/2n2/2P2/P2PP/RNBQK b": [13, 125, 1728, 22373, 340231],
+    "4k/1P3/5/5/3p1/K4 w": [4, 16, 147, 1331, 15131],
+    "k4/5/2q2/2Q2/5/4K w": [17, 296, 4932, 81476],
+}
+
+# (position, capture, SEE) with hand-checked exchange results
+SEE_REFERENCE = [
+    ("k4/5/1p3/p4/1Q3/4K w", "b2a3", -800),   # queen takes a defended pawn
+    ("k4/5/1p3/p4/1Q3/4K w", "b2b4", 100),
+    ("k4/5/1n3/P4/5/4K w", "a3b4", 320),      # undefended knight
+    ("k4/1b3/2p2/5/2R2/2Q1K w", "c2c4", -70),  # RxP BxR QxB, queen x-ray behind the rook
+    ("k4/2r2/2p2/5/2R2/2Q1K w", "c2c4", 100),  # black does not recapture into the battery
+    ("k4/1q3/1r3/1p3/1R3/1R2K w", "b2b3", -400),
+    ("k4/5/1p3/2q2/3K1/5 w", "d2c3", -19100),  # king takes a defended queen
+]
+
+
+def random_playout_positions(games=200, max_plies=60, seed=1234):
+    """Yields (board_state, bitboard_state) pairs along random games from the start position."""
+    rng = random.Random(seed)
+    move_generator = MoveGenerator()
+
+    for _ in range(games):
+        board_state = BoardState(True)
+        bitboard_state = BitboardState(True)
+
+        for _ in range(max_plies):
+            yield board_state, bitboard_state
+
+            moves = move_generator.generate_all_moves(board_state)
+            if not moves:
+                break
+            move = rng.choice(moves)
+            board_state.make_move(move)
+            bitboard_state.make_move(move)
+            if board_state.is_check_mate():
+                break
+
+        # unwind to test undo_move as well
+        while board_state.move_history:
+            board_state.undo_move()
+            bitboard_state.undo_move()
+            assert board_state.squares == bitboard_state.squares
+            assert hash(board_state) == hash(bitboard_state)
+
+
+def verify_bitboard_move_generation(games=200):
+    move_generator = MoveGenerator()
+    bitboard_move_generator = BitboardMoveGenerator()
+    positions = 0
+
+    for board_state, bitboard_state in random_playout_positions(games):
+        expected = sorted(move_generator.generate_all_moves(board_state))
+        actual = sorted(bitboard_move_generator.generate_all_moves(bitboard_state))
+        assert expected == actual, f"Move lists differ:\n{board_state.board}\n{expected}\n{actual}"
+        assert all(MoveState.from_packed(move).to_packed() == move for move in expected)
+
+        # the staged generators cover the same moves as the mailbox ones, captures read off the enemy occupancy
+        all_moves = bitboard_move_generator.generate_all_moves(bitboard_state)
+        for include_promotions in (False, True):
+            expected = [move for move in all_moves
+                        if move_is_capture(move) or (include_promotions and move_is_promoted(move))]
+            actual = bitboard_move_generator.generate_capture_moves(bitboard_state, include_promotions)
+            assert expected == actual, f"Capture lists differ:\n{board_state.board}\n{expected}\n{actual}"
+        expected = sorted(move_generator.generate_quiet_moves(board_state))
+        actual = sorted(bitboard_move_generator.generate_quiet_moves(bitboard_state))
+        assert expected == actual, f"Quiet lists differ:\n{board_state.board}\n{expected}\n{actual}"
+        for index in board_state.own_pieces():
+            assert (sorted(move_generator.generate_square_moves(board_state, index))
+                    == sorted(bitboard_move_generator.generate_square_moves(bitboard_state, index)))
+        assert all(bitboard_move_generator.is_pseudo_legal(bitboard_state, move) for move in all_moves)
+
+        # incremental hash and bitboards must match a rebuild from the squares
+        rebuilt = bitboard_state.copy()
+        assert hash(rebuilt) == hash(board_state)
+        rebuilt.load_piece_lists()
+        assert rebuilt.white_pieces == board_state.white_pieces == bitboard_state.white_pieces
+        assert rebuilt.black_pieces == board_state.black_pieces == bitboard_state.black_pieces
+        assert rebuilt.piece_boards == bitboard_state.piece_boards
+        assert rebuilt.white_occupancy == bitboard_state.white_occupancy
+        assert rebuilt.black_occupancy == bitboard_state.black_occupancy
+        positions += 1
+
+    print(f"Bitboard move generation: {positions} positions OK")
+
+
+def verify_capture_move_generation(games=200):
+    move_generator = MoveGenerator()
+    positions = 0
+
+    for board_state, _ in random_playout_positions(games, seed=4321):
+        all_moves = move_generator.generate_all_moves(board_state)
+
+        expected = [move for move in all_moves if move_is_capture(move)]
+        actual = move_generator.generate_capture_moves(board_state)
+        assert expected == actual, f"Capture lists differ:\n{board_state.board}\n{expected}\n{actual}"
+
+        expected = [move for move in all_moves if move_is_capture(move) or move_is_promoted(move)]
+        actual = move_generator.generate_capture_moves(board_state, include_promotions=True)
+        assert expected == actual, f"Capture/promotion lists differ:\n{board_state.board}\n{expected}\n{actual}"
+
+        # quiet moves are the rest, so the search stages cover every move exactly once
+        expected = [move for move in all_moves if not (move_is_capture(move) or move_is_promoted(move))]
+        actual = move_generator.generate_quiet_moves(board_state)
+        assert sorted(expected) == sorted(actual), f"Quiet lists differ:\n{board_state.board}\n{expected}\n{actual}"
+        assert all(move_generator.is_pseudo_legal(board_state, move) for move in all_moves)
+        # the move order only depends on the position, not on how the board got there
+        assert all_moves == move_generator.generate_all_moves(board_from_fen(board_to_fen(board_state)))
+        positions += 1
+
+    print(f"Capture and quiet move generation: {positions} positions OK")
+
+
+def verify_incremental_evaluation(games=200):
+    positions = 0
+    for board_state, bitboard_state in random_playout_positions(games, seed=2468):
+        rebuilt = board_state.copy()
+        rebuilt.load_evaluation()
+        for state in (board_state, bitboard_state):
+            assert (state.material, state.piece_square, state.piece_counts) == \
+                   (rebuilt.material, rebuilt.piece_square, rebuilt.piece_counts), f"Totals differ:\n{board_state.board}"
+        for engine_white_turn in (True, False):
+            assert evaluate_board(board_state, engine_white_turn) == evaluate_board_full(board_state, engine_white_turn)
+
+        # A null move only passes the turn, the incremental hash has to match a fresh one
+        key = hash(board_state)
+        board_state.make_null_move()
+        assert hash(board_state) == hash(board_from_fen(board_to_fen(board_state)))
+        board_state.undo_null_move()
+        assert hash(board_state) == key
+        positions += 1
+
+    print(f"Incremental evaluation: {positions} positions OK")
+
+
+def verify_repetition():
+    board_state = board_from_fen(START_FEN)
+    move_generator = MoveGenerator()
+    knight_shuffle = ["b1c3", "b6c4", "c3b1", "c4b6"]
+
+    def play(moves):
+        for notation in moves:
+            board_state.make_move(next(move for move in move_generator.generate_all_moves(board_state)
+                                       if format_move(move) == notation))
+
+    key = hash(board_state)
+    play(knight_shuffle)
+    assert hash(board_state) == key and board_state.is_repetition() and not board_state.is_repetition(2)
+    play(knight_shuffle)
+    assert board_state.is_repetition(2)
+    # a pawn move makes every earlier position unreachable
+    play(["a2a3"])
+    assert not board_state.is_repetition()
+    for _ in range(9):
+        board_state.undo_move()
+    assert hash(board_state) == key and not board_state.key_stack
+
+    print("Repetition detection OK")
+
+
+def verify_static_exchange():
+    move_generator = MoveGenerator()
+    static_exchange = StaticExchange(move_generator)
+    for fen, capture, expected in SEE_REFERENCE:
+        board_state = board_from_fen(fen)
+        move = next(move for move in move_generator.generate_capture_moves(board_state) if format_move(move) == capture)
+        actual = static_exchange.see(board_state, move)
+        assert actual == expected, f"SEE of {capture} in {fen}: {actual}, expected {expected}"
+
+    print(f"Static exchange evaluation: {len(SEE_REFERENCE)} positions OK")
+
+
+def verify_perft():
+    bitboard_move_generator = BitboardMoveGenerator()
+    for fen, expected in PERFT_REFERENCE.items():
+        for depth, nodes in enumerate(expected, start=1):
+            board_state = board_from_fen(fen)
+            assert perft(board_state, depth) == nodes, f"Perft {depth} of {fen}"
+            assert perft(board_state, depth, cache={}) == nodes, f"Hashed perft {depth} of {fen}"
+            assert board_state.squares == board_from_fen(fen).squares
+
+        depth = min(len(expected), 4)
+        assert perft(board_from_fen(fen, BitboardState), depth, bitboard_move_generator) == expected[depth - 1]
+        assert sum(divide(board_from_fen(fen), depth).values()) == expected[depth - 1]
+
+    assert sum(divide(board_from_fen(START_FEN), 4, jobs=2).values()) == PERFT_REFERENCE[START_FEN][3]
+    print(f"Perft: {len(PERFT_REFERENCE)} positions OK")
+
+
+if __name__ == "__main__":
+    verify_bitboard_move_generation()
+    verify_capture_move_generation()
+    verify_incremental_evaluation()
+    verify_repetition()
+    verify_static_exchange()
+    verify_perft()
@@ -0,0 +1,206 @@
+import contextlib
+import io
+import subprocess
+import sys
+from multiprocessing import shared_memory
+
+from src.main.engine.engine import Engine, INF
+from src.main.engine.shared_transposition_table import SharedTranspositionTable
+from src.main.engine.transposition_table import TranspositionTable
+from src.main.gameplay.bitboard_move_generator import BitboardMoveGenerator
+from src.main.gameplay.bitboard_state import BitboardState
+from src.main.gameplay.perft import board_from_fen, board_to_fen, format_move
+
+
+# Fixed depth 4 root results without margin pruning (delta / futility), recorded with the minimax search
+# (separate maximizing / minimizing branches) with the quiescence stand-pat fix of the negamax rewrite applied:
+# its minimizing branch used the maximizer's stand-pat test, and unpatched it disagrees on 21 of the 40 positions.
+# position -> (root moves sharing the best score, best score from the side to move's perspective)
+SEARCH_DEPTH = 4
+SEARCH_REFERENCE = {
+    "rnbqk/ppppp/5/5/PPPPP/RNBQK w": (["b2b3", "d2d3", "a2a3", "e2e3", "c2c3"], 0),
+    "1rbk1/2pp1/1p3/Np3/PnPBP/R2QK w": (["d1c1"], 650),
+    "3q1/3kQ/b1PP1/Pr3/3P1/RNB1K w": (["c4d5", "e5d5"], 1000003),
+    "rqb1k/1p2p/p1pp1/P2P1/RPPKP/2BQ1 w": (["d3c4", "d2e1"], -25),
+    "r1bqk/ppppp/2n2/2P1P/PP1P1/RNBQK b": (["a5a4", "b5b4", "e5e4", "c4b6", "d5d4"], -30),
+    "rn1Nk/p1p1p/1p3/2q2/P2P1/1R2K w": (["d2c3"], -530),
+    "1rb1k/1ppp1/pP2p/5/PqPPP/RN1K1 w": (["b4c5"], -1250),
+    "2q1k/2p1p/p4/3QP/P1KP1/1rB2 w": (["d3c4"], 410),
+    "rnbqk/pppp1/4p/4P/PPPP1/RNBQK w": (["b2b3"], 10),
+    "r1bqk/ppppp/2n2/1QP2/PP1PP/RNB1K b": (["a5a4", "b5b4", "e5e4", "d5d4"], 20),
+    "1r3/p1pk1/1QKqp/2PP1/RP2P/1N3 b": (["d4c4", "d5c4"], 1000003),
+    "1nb1k/1p2p/2ppP/1rQP1/PP1N1/R1B1K w": (["c3a5"], 1145),
+    "r1b1k/ppppq/4p/2P1P/Pn1P1/RNBQK w": (["c1b2"], 210),
+    "r1bqk/2pp1/ppn1P/NP1p1/P1P1Q/R1B1K b": (["d3e2"], 775),
+    "1rb2/pppN1/P2pk/3Pp/1PPBP/R2QK w": (["d3e4"], 1000003),
+    "rnbqk/p1ppp/1p3/P2P1/1PP1P/RNBQK b": (["b6a4"], 0),
+    "2bqk/1p1np/rp1p1/2PPP/PP2K/RNB2 b": (["b4c3"], 980),
+    "1rbqk/1ppp1/p3p/1PPPP/P4/RnBQK w": (["a1b1"], 30),
+    "r1bq1/1ppk1/Pn3/P1ppP/2PK1/R1B1Q w": (["d2c3"], -365),
+    "4k/p1qpp/1rb2/2P1B/PP2P/R2NK w": (["e3c5"], 470),
+    "rn1k1/3pq/ppK2/2P1B/PP2P/R3N w": (["c4b5"], -395),
+    "1r1q1/pb1pk/1p2p/N1B1P/P1p2/1RQK1 b": (["c2d1q"], 1000003),
+    "r1bqk/ppp2/n2pP/4B/PPP1P/RN1QK w": (["e3c1"], 0),
+    "rnbk1/pp2N/2ppp/PP1PP/2P2/R1BQK w": (["e3d4", "e5c6"], 1155),
+    "rnbqk/p1ppp/1p2P/5/PPPP1/RNBQK b": (["d5e4"], 120),
+    "r2qk/npp1p/2Np1/3b1/P1PPP/1RBQK b": (["d3c4"], 350),
+    "r1bqk/ppppp/2n2/2P2/PPQPP/RNB1K b": (["a5a4", "b5b4", "d5d4", "e5e4", "c4b6"], -30),
+    "1n1k1/rpK2/p1p1b/P2P1/P4/RNBQ1 b": (["d6c5"], 1000003),
+    "1nb2/2rk1/pR1Pp/4B/2P1q/1N1QK w": (["d1e2"], 1320),
+    "rNbqk/1pppp/p4/3P1/PPP1P/R1BnK w": (["b6a4"], -805),
+    "rnb1k/pp1pp/q1N2/3PB/PPP1P/R2QK b": (["b5c4", "d5c4"], 190),
+    "3qk/r1B1p/p1N1Q/5/PP1K1/1R3 b": (["d6d2"], 1000003),
+    "rnbqk/1pppp/p4/5/PPPPP/RNBQK b": (["b5b4", "d5d4", "e5e4", "c5c4"], 10),
+    "1n1qk/rb2p/p1Pp1/N4/P1PPP/R1BQK w": (["c4b5"], 605),
+    "rnbqk/2p1p/pp1p1/P1P2/1PQPP/RNB1K b": (["b4b3"], 50),
+    "r1bqk/3pp/npp1N/3P1/P1p1P/1RBQK b": (["c2d1q"], 1545),
+    "r1b2/p3p/P1Pk1/N1PK1/p4/2B2 w": (["c3d4", "d3d4"], 1000003),
+    "r1bqk/pppp1/2P1p/P2P1/2Q1P/RNBnK b": (["d6e5"], 55),
+    "r1bqk/ppppp/Q4/N1P2/Pn1PP/R1B1K b": (["b2a4"], 1035),
+    "1rbkq/ppp2/3pp/P2PP/1nPKQ/RNB2 w": (["c1b2"], 180),
+}
+# nodes + q nodes the (stand-pat fixed) minimax search needed for the whole set
+SEARCH_REFERENCE_NODES = 353622
+
+
+def verify_search(depth=SEARCH_DEPTH, bitboards=False):
+    """bitboards searches BitboardState boards with the BitboardMoveGenerator, the moves come in another order"""
+    total_nodes = 0
+    for fen, (best_moves, best_score) in SEARCH_REFERENCE.items():
+        if bitboards:
+            board_state = board_from_fen(fen, BitboardState)
+            move_generator = BitboardMoveGenerator()
+        else:
+            board_state = board_from_fen(fen)
+            move_generator = None
+        engine = Engine(depth, engine_white_turn=board_state.is_white_turn, delta_margin=None, futility_margins=None,
+                        use_null_move=False, late_move_reductions=None, move_generator=move_generator)
+        with contextlib.redirect_stdout(io.StringIO()):
+            move = engine.play_move(board_state)
+
+        assert format_move(move) in best_moves, f"{fen}: played {format_move(move)}, expected one of {best_moves}"
+        assert engine.stats.evaluation == best_score, f"{fen}: score {engine.stats.evaluation}, expected {best_score}"
+        assert engine.principal_variation[0] == move
+        for pv_move in engine.principal_variation:
+            assert engine.move_generator.is_pseudo_legal(board_state, pv_move), f"{fen}: broken principal variation"
+            board_state.make_move(pv_move)
+        total_nodes += engine.stats.nodes_visited + engine.stats.q_nodes_visited
+
+    assert total_nodes < SEARCH_REFERENCE_NODES
+    print(f"Search{' (bitboards)' if bitboards else ''}: {len(SEARCH_REFERENCE)} positions OK, "
+          f"{total_nodes} nodes (minimax: {SEARCH_REFERENCE_NODES})")
+
+
+def verify_parallel_search(depth=SEARCH_DEPTH, workers=2):
+    """The root split has to find the serial result: the same score, and a move sharing it"""
+    for fen, (best_moves, best_score) in SEARCH_REFERENCE.items():
+        board_state = board_from_fen(fen)
+        engine = Engine(depth, engine_white_turn=board_state.is_white_turn, delta_margin=None, futility_margins=None,
+                        use_null_move=False, late_move_reductions=None, workers=workers)
+        with contextlib.redirect_stdout(io.StringIO()):
+            move = engine.play_move(board_state)
+        engine.close()
+
+        assert format_move(move) in best_moves, f"{fen}: played {format_move(move)} with {workers} workers, expected one of {best_moves}"
+        assert engine.stats.evaluation == best_score, f"{fen}: score {engine.stats.evaluation} with {workers} workers, expected {best_score}"
+
+    print(f"Parallel search: {len(SEARCH_REFERENCE)} positions OK with {workers} workers")
+
+
+def verify_time_limit():
+    """Even without any time left play_move returns a searched move: depth 1 always completes"""
+    # the queens need more than 256 quiescence nodes at depth 1, enough for the search to look at the clock
+    for fen in [*SEARCH_REFERENCE, "qqqqk/qqqqq/5/5/QQQQQ/QQQQK w"]:
+        for time_limit in (0, 0.01):
+            board_state = board_from_fen(fen)
+            engine = Engine(SEARCH_DEPTH, engine_white_turn=board_state.is_white_turn)
+            with contextlib.redirect_stdout(io.StringIO()):
+                move = engine.play_move(board_state, time_limit=time_limit)
+
+            assert board_to_fen(board_state) == fen, f"{fen}: board not restored after the timeout"
+            assert engine.stats.depth_reached >= 1 and -INF < engine.stats.evaluation < INF
+            assert time_limit or engine.stats.depth_reached == 1
+            assert engine.principal_variation[0] == move
+            assert engine.move_generator.is_pseudo_legal(board_state, move)
+
+    print(f"Time limit: {len(SEARCH_REFERENCE) + 1} positions OK")
+
+
+def verify_transposition_tables():
+    for table in (TranspositionTable(1), SharedTranspositionTable(1)):
+        table.store(12345, -1000004, 5, 'LOWERBOUND', 0x3ABCDE)
+        table.store(67890, 42, -3, 'UPPERBOUND')
+        entry = table.probe(12345)
+        assert (entry.value, entry.depth, entry.flag, entry.best_move) == (-1000004, 5, 'LOWERBOUND', 0x3ABCDE)
+        entry = table.probe(67890)
+        assert (entry.value, entry.depth, entry.flag, entry.best_move) == (42, -3, 'UPPERBOUND', None)
+        assert table.probe(54321) is None
+        if isinstance(table, SharedTranspositionTable):
+            table.close()
+
+    # A full bucket gives up its least worth entry, an old deep entry loses against a fresh shallower one
+    table = TranspositionTable(1, bucket_size=2)
+    same_bucket = [12345 + bucket * table.buckets for bucket in range(3)]
+    table.store(same_bucket[0], 0, 6, 'EXACT')
+    for _ in range(2):
+        table.end_search()
+    table.store(same_bucket[1], 0, 2, 'EXACT')
+    table.store(same_bucket[2], 0, 1, 'EXACT')
+    assert table.probe(same_bucket[0]) is None and table.probe(same_bucket[1]) and table.probe(same_bucket[2])
+    assert len(table) == 2
+
+    # A shallower bound (quiescence ones have depth 0 and below) leaves a deeper entry, refreshing only its move.
+    # An exact result or one of a later search replaces it
+    for table in (TranspositionTable(1), SharedTranspositionTable(1)):
+        table.store(12345, 300, 4, 'LOWERBOUND', 0x111)
+        for depth in (0, -2):
+            table.store(12345, -50, depth, 'UPPERBOUND', 0x222)
+            entry = table.probe(12345)
+            assert (entry.value, entry.depth, entry.flag, entry.best_move) == (300, 4, 'LOWERBOUND', 0x222)
+        table.store(12345, 120, 2, 'EXACT')
+        entry = table.probe(12345)
+        assert (entry.value, entry.depth, entry.flag, entry.best_move) == (120, 2, 'EXACT', 0x222)
+        table.store(12345, 80, 5, 'UPPERBOUND', 0x333)
+        table.end_search()
+        table.store(12345, 60, 1, 'LOWERBOUND')
+        entry = table.probe(12345)
+        assert (entry.value, entry.depth, entry.flag, entry.best_move) == (60, 1, 'LOWERBOUND', 0x333)
+        if isinstance(table, SharedTranspositionTable):
+            table.close()
+
+    # The shared table keeps a deep entry against another position of the same search, until it ages.
+    # The generation is in the shared memory, an attached table ages with the owner's end_search
+    table = SharedTranspositionTable(1)
+    attached = SharedTranspositionTable(name=table.name)
+    same_slot = [12345 + slot * table.slots for slot in range(3)]
+    table.store(same_slot[0], 0, 6, 'EXACT')
+    attached.store(same_slot[1], 0, 2, 'EXACT')
+    assert table.probe(same_slot[0]) and attached.probe(same_slot[1]) is None
+    table.end_search()
+    attached.store(same_slot[1], 0, 2, 'EXACT')
+    assert table.probe(same_slot[1]) and table.probe(same_slot[0]) is None
+    attached.close()
+    table.close()
+    table.close()  # closed twice (the exit handler does it again too), the second time is a no-op
+
+    # A table the program forgets to close is closed and unlinked cleanly when the process exits
+    process = subprocess.run([sys.executable, "-c", "from src.main.engine.shared_transposition_table import "
+                              "SharedTranspositionTable; print(SharedTranspositionTable(1).name)"],
+                             capture_output=True, text=True, check=True)
+    assert not process.stderr, process.stderr
+    name = process.stdout.strip()
+    try:
+        shared_memory.SharedMemory(name=name).close()
+        assert False, f"shared table {name} leaked"
+    except FileNotFoundError:
+        pass
+
+    print("Transposition tables OK")
+
+
+if __name__ == "__main__":
+    verify_transposition_tables()
+    verify_search()
+    verify_search(bitboards=True)
+    verify_time_limit()
+    verify_parallel_search()